@@ -34,17 +34,29 @@ class MainInterface:
 
     @ld.debug_timer_dec(logger=LOGGER)
     def __run_list_1(self):
-        from AgentBasedModeling.helpers.burning import wind, forest_fire_model as ffm
-        wind.Wind(self._args.wind_direction, self._args.wind_strength, self._args.wind_random)
+        from AgentBasedModeling.helpers.burning import wind, forest_fire_model as ffm, lattice_fire_model as lfm
+        from AgentBasedModeling.helpers.burning import sparse_fire_model as sfm
+        import AgentBasedModeling.common.shared_cls.state_recorder as sr
+        wind_state = wind.Wind(self._args.wind_direction, self._args.wind_strength, self._args.wind_random)
         if self._args.draw_results:
             plt_eng = ffm.pe.PlottingEngine(self._args.lattice_size, (11.5, 8), out_directory=self._args.out_path)
         else:
             plt_eng = None
-        fire = ffm.ForestFireModel(self._args.lattice_size, self._args.plant_probability, plt_eng)
+        if self._args.engine == 'lattice':
+            fire_model = lfm.LatticeForestFireModel
+        elif self._args.engine == 'sparse':
+            fire_model = sfm.SparseForestFireModel
+        else:
+            fire_model = ffm.ForestFireModel
+        fire = fire_model(self._args.lattice_size, self._args.plant_probability, plt_eng, wind_state=wind_state)
+        if self._args.record is not None:
+            fire.recorder = sr.StateRecorder(self._args.record, self._args.record_stride)
         fire.create_cells()
         fire.plant_trees()
         fire.start_fire()
         fire.burn()
+        if fire.recorder is not None:
+            fire.recorder.close()
         if fire.is_top_hit:
             LOGGER.info('List 1, fire reached the other side of forest.')
         else:
@@ -54,7 +66,13 @@ class MainInterface:
     @ld.debug_timer_dec(logger=LOGGER)
     def __run_list_3(self):
         from AgentBasedModeling.helpers.game_of_life.game import GameOfLife
-        gol = GameOfLife.from_csv(
+        from AgentBasedModeling.helpers.game_of_life.array_game import ArrayGameOfLife
+        from AgentBasedModeling.helpers.game_of_life.bitboard_game import BitboardGameOfLife
+        from AgentBasedModeling.helpers.game_of_life.sparse_game import SparseGameOfLife
+        game_class = {
+            'array': ArrayGameOfLife, 'bitboard': BitboardGameOfLife, 'sparse': SparseGameOfLife
+        }.get(self._args.engine, GameOfLife)
+        gol = game_class.from_file(
             self._args.initial_state_file,
             delimiter=self._args.separator,
             truth_marker=self._args.alive_marker,
@@ -62,9 +80,13 @@ class MainInterface:
             borders=self._args.borders
         )
 
-        gol.overpopulation_threshold = self._args.op_threshold
-        gol.underpopulation_threshold = self._args.up_threshold
-        gol.reproduction_range = self._args.reproduction_range
+        # Thresholds not given keep the ones of the game, set by the rule of RLE header if there is one.
+        if self._args.op_threshold is not None:
+            gol.overpopulation_threshold = self._args.op_threshold
+        if self._args.up_threshold is not None:
+            gol.underpopulation_threshold = self._args.up_threshold
+        if self._args.reproduction_range is not None:
+            gol.reproduction_range = self._args.reproduction_range
         gol.link_cells()
         gol.process()
         gol.plotting_engine.animate()
@@ -72,13 +94,15 @@ class MainInterface:
     @ld.debug_timer_dec(logger=LOGGER)
     def __run_list_4(self):
         import AgentBasedModeling.helpers.schellings.schellings_model as sm
+        import AgentBasedModeling.helpers.schellings.array_model as am
         import matplotlib.pyplot as plt
         import os
         if len(self._args.happiness_thresholds) == 1:
             thresholds = self._args.happiness_thresholds[0]
         else:
             thresholds = self._args.happiness_thresholds
-        s_m = sm.SchellingModel(
+        model = am.ArraySchellingModel if self._args.engine == 'array' else sm.SchellingModel
+        s_m = model(
             self._args.grid_length,
             self._args.neighbourhood_depth,
             self._args.agents_count,
@@ -0,0 +1,102 @@
+import concurrent.futures as cf
+import os
+import random
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import AgentBasedModeling.common.log.logger as logger
+
+LOGGER = logger.get_logger(__name__)
+
+Row = Dict[str, Any]
+
+
+def int_seed(seed: np.random.SeedSequence) -> int:
+    """Seed of the random module (or of random.Random) drawn from a SeedSequence."""
+    return int(seed.generate_state(1)[0])
+
+
+def child_seeds(seed: Optional[Any], count: int) -> List[np.random.SeedSequence]:
+    """Independent seeds of count repetitions within a task, spawned from its SeedSequence (int or None is turned
+    into one first, None meaning fresh entropy)."""
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(count)
+
+
+def _run_chunk(
+        task: Callable[..., Any], chunk: List[Tuple[int, Row, np.random.SeedSequence]]
+) -> List[Tuple[int, Row]]:
+    rows = []
+    for index, point, seed in chunk:
+        # Models drawing from the random module get their own stream as well.
+        random.seed(int_seed(seed))
+        result = task(**point, seed=seed)
+        row = dict(point)
+        row['seed_index'] = seed.spawn_key[-1]
+        if isinstance(result, dict):
+            row.update(result)
+        else:
+            row['value'] = result
+        rows.append((index, row))
+    return rows
+
+
+class SweepRunner:
+    """Runs a task for every point of parameter grid in a process pool.
+
+    Task is called as task(**point, seed=seed_sequence) and must be picklable, so module level function or
+    functools.partial of one. Every point gets its own SeedSequence spawned from the root seed, so results do not
+    depend on number of workers or order of completion. Dict results are merged into the row, anything else is
+    stored under 'value'.
+    """
+
+    def __init__(
+            self, task: Callable[..., Any], workers: Optional[int] = None, chunk_size: int = 1,
+            seed: Optional[int] = None
+    ):
+        self.task = task
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(chunk_size, 1)
+        self.seed_sequence = np.random.SeedSequence(seed)
+
+    def _chunks(self, grid: List[Row]) -> Iterator[List[Tuple[int, Row, np.random.SeedSequence]]]:
+        seeds = self.seed_sequence.spawn(len(grid))
+        tasks = list(zip(range(len(grid)), grid, seeds))
+        for start in range(0, len(tasks), self.chunk_size):
+            yield tasks[start:start + self.chunk_size]
+
+    def _stream_indexed(self, grid: Iterable[Row]) -> Iterator[Tuple[int, Row]]:
+        grid = list(grid)
+        if self.workers == 1:
+            for chunk in self._chunks(grid):
+                yield from _run_chunk(self.task, chunk)
+            return
+        with cf.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(_run_chunk, self.task, chunk) for chunk in self._chunks(grid)]
+            for done, future in enumerate(cf.as_completed(futures), start=1):
+                LOGGER.debug('Finished chunk {done}/{total}.'.format(done=done, total=len(futures)))
+                yield from future.result()
+
+    def stream(self, grid: Iterable[Row]) -> Iterator[Row]:
+        """Yield result rows as soon as their chunks complete."""
+        for _, row in self._stream_indexed(grid):
+            yield row
+
+    def run(self, grid: Iterable[Row]) -> List[Row]:
+        """Collect all result rows into one table ordered like the grid."""
+        return [row for _, row in sorted(self._stream_indexed(grid), key=lambda indexed: indexed[0])]
+
+
+def grid_of(**axes: Iterable[Any]) -> List[Row]:
+    """Cartesian product of named axes, e.g. grid_of(lattice_size=[10, 20], plant_probability=[0.4, 0.6])."""
+    grid = [{}]
+    for name, values in axes.items():
+        grid = [dict(point, **{name: value}) for point in grid for value in values]
+    return grid
+
+
+def column(table: Iterable[Row], name: str, **where: Any) -> List[Any]:
+    """Values of one column from rows matching all where conditions."""
+    return [row[name] for row in table if all(row[key] == value for key, value in where.items())]
@@ -61,6 +61,27 @@ class ProjectArgParser(argparse.ArgumentParser):
             help='Animation will be created.'
         )
 
+        l_par.add_argument(
+            '--engine',
+            action='store', required=False, default='object', type=str,
+            choices=['object', 'lattice', 'sparse'],
+            help='Simulation engine. Lattice engine keeps the forest in an array and scales to big lattices, '
+                 'sparse engine keeps only the trees and suits big lattices with low plant probability.'
+        )
+
+        l_par.add_argument(
+            '--record',
+            action='store', required=False, default=None, type=str,
+            help='Record fire spread into this directory (or .h5 file), render it later with '
+                 'python -m AgentBasedModeling.common.shared_cls.render_recording.'
+        )
+
+        l_par.add_argument(
+            '--record_stride',
+            action='store', required=False, default=1, type=int,
+            help='Record every n-th step only.'
+        )
+
     def _list_subparser_3(self):
         l_par = self._subs.add_parser('three', help='Options for list 3.')
         l_par.set_defaults(list='three')
@@ -68,7 +89,8 @@ class ProjectArgParser(argparse.ArgumentParser):
         l_par.add_argument(
             '--initial_state_file', '-i',
             action='store', required=True,
-            help='Path to file with initial state of game.'
+            help='Path to file with initial state of game. CSV, or RLE (.rle), plaintext (.cells) or raw bitmap '
+                 '(.bitmap) pattern.'
         )
 
         l_par.add_argument(
@@ -87,20 +109,23 @@ class ProjectArgParser(argparse.ArgumentParser):
 
         l_par.add_argument(
             '--up_threshold',
-            action='store', required=False, type=int, default=2,
-            help='Underpopulation threshold. Cell having less than this number of alive neighbours dies.'
+            action='store', required=False, type=int, default=None,
+            help='Underpopulation threshold. Cell having less than this number of alive neighbours dies. '
+                 'Rule of RLE header, 2 otherwise, by default.'
         )
 
         l_par.add_argument(
             '--op_threshold',
-            action='store', required=False, type=int, default=3,
-            help='Overpopulation threshold. Cell having more than this number of alive neighbours dies.'
+            action='store', required=False, type=int, default=None,
+            help='Overpopulation threshold. Cell having more than this number of alive neighbours dies. '
+                 'Rule of RLE header, 3 otherwise, by default.'
         )
 
         l_par.add_argument(
             '--reproduction_range',
-            action='store', required=False, nargs=2, type=int, default=[3, 3],
-            help='Range of number of alive cells that a dead cell must have to be brought to life.'
+            action='store', required=False, nargs=2, type=int, default=None,
+            help='Range of number of alive cells that a dead cell must have to be brought to life. '
+                 'Rule of RLE header, 3 3 otherwise, by default.'
         )
 
         l_par.add_argument(
@@ -115,6 +140,15 @@ class ProjectArgParser(argparse.ArgumentParser):
             help='Marker used to denote alive cell in input file. Same marker of neighbouring must be used.'
         )
 
+        l_par.add_argument(
+            '--engine',
+            action='store', required=False, default='object', type=str,
+            choices=['object', 'array', 'bitboard', 'sparse'],
+            help='Simulation engine. Array engine keeps the board in an array and scales to big boards, bitboard '
+                 'engine packs 64 cells per word and scales to huge ones, sparse engine evaluates only the '
+                 'neighbourhood of changes and suits mostly dead boards.'
+        )
+
     def _list_subparser_4(self):
         l_par = self._subs.add_parser('four', help='Options for list 4.')
         l_par.set_defaults(list='four')
@@ -160,4 +194,13 @@ class ProjectArgParser(argparse.ArgumentParser):
             action='store', required=False, default='random', type=str,
             choices=['random', 'happiness'],
             help='Type of moving to perform on unhappy agents.'
+        )
+
+        l_par.add_argument(
+            '--engine',
+            action='store', required=False, default='object', type=str,
+            choices=['object', 'array'],
+            help='Simulation engine. Object engine moves unhappy agents one by one, array engine keeps the grid in an '
+                 'array and moves all unhappy agents of an iteration at once, so its results differ from the object '
+                 'engine ones.'
         )
\ No newline at end of file
@@ -0,0 +1,98 @@
+import abc
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+import AgentBasedModeling.common.log.logger as log
+
+LOGGER = log.get_logger(__name__)
+
+
+class FramePipeline:
+    """Runs rendering calls in order on a single background thread.
+
+    Matplotlib figures are not thread safe, so one thread owns the figure for the whole run, while the simulation
+    only hands over snapshots of its state. Queue is bounded: submit blocks when max_pending calls wait already,
+    which keeps memory of queued snapshots in check when rendering is slower than the simulation. First error raised
+    by a rendering call is re-raised in the simulation thread by the next submit or join. Thread ends with close.
+    """
+
+    def __init__(self, max_pending: int = 8):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._work, name='frame-renderer', daemon=True)
+        self._thread.start()
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                self._queue.task_done()
+                return
+            render, args = task
+            try:
+                if self._error is None:
+                    render(*args)
+            except Exception as e:
+                LOGGER.error('Frame rendering failed: {e}'.format(e=e))
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, render: Callable[..., Any], *args: Any):
+        self._raise_error()
+        self._queue.put((render, args))
+
+    def join(self):
+        """Wait until all submitted calls are rendered."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Wait until all submitted calls are rendered and end the thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+
+class BackgroundRendering(abc.ABC):
+    """Mixin of plotting engines that turns drawing of model snapshots asynchronous on demand.
+
+    Models pass their state to submit_snapshot, which calls draw_snapshot of the engine either right away or, with
+    render_in_background set (on class or instance), on FramePipeline thread. Anything that has to stay in order
+    with the frames goes through submit as well, and everything reading finished frames calls wait_for_frames, or
+    close_frames once no more frames are coming, which ends the thread as well.
+    """
+
+    render_in_background: bool = False
+    max_pending_frames: int = 8
+    _frame_pipeline: Optional[FramePipeline] = None
+
+    @abc.abstractmethod
+    def draw_snapshot(self, snapshot: Any): ...
+
+    def submit(self, render: Callable[..., Any], *args: Any):
+        if not self.render_in_background:
+            render(*args)
+            return
+        if self._frame_pipeline is None:
+            self._frame_pipeline = FramePipeline(self.max_pending_frames)
+        self._frame_pipeline.submit(render, *args)
+
+    def submit_snapshot(self, snapshot: Any):
+        self.submit(self.draw_snapshot, snapshot)
+
+    def wait_for_frames(self):
+        if self._frame_pipeline is not None:
+            self._frame_pipeline.join()
+
+    def close_frames(self):
+        """Wait for all frames and end the pipeline thread, a later submit starts a new one."""
+        if self._frame_pipeline is not None:
+            pipeline, self._frame_pipeline = self._frame_pipeline, None
+            pipeline.close()
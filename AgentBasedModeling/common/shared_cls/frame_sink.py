@@ -0,0 +1,128 @@
+import collections
+import os
+from typing import Deque, Iterable, List, Optional
+
+import numpy as np
+import matplotlib.figure as mfigure
+import imageio as iio
+
+import AgentBasedModeling.common.log.logger as log
+
+LOGGER = log.get_logger(__name__)
+
+
+def open_writer(file_path: str, frame_duration: float):
+    """GIF writer takes frame duration, video formats (mp4, ...) take frames per second."""
+    if file_path.lower().endswith('.gif'):
+        return iio.get_writer(file_path, mode='I', duration=frame_duration)
+    return iio.get_writer(file_path, mode='I', fps=1 / frame_duration)
+
+
+def encode_files(file_paths: Iterable[str], out_path: str, frame_duration: float):
+    """Build animation out of image files already on disk."""
+    with open_writer(out_path, frame_duration) as w:
+        for file in file_paths:
+            w.append_data(iio.imread(file))
+
+
+class FrameSink:
+    """Streams frames of a figure straight from the Agg canvas into an imageio writer.
+
+    Writer is opened with the first frame, so the animation grows while the simulation runs and no frame has to be
+    encoded to PNG and read back. With keep_frames every frame is additionally saved as numbered PNG file, as
+    plotting engines used to do.
+    """
+
+    frame_paths: List[str]
+    _recent: Deque[np.ndarray]
+
+    def __init__(
+            self, out_directory: str, out_name: str = 'animation.gif', frame_duration: float = 0.8,
+            keep_frames: bool = False, history: int = 1
+    ):
+        """
+        :param out_directory: directory for the animation and kept frames, must exist.
+        :param out_name: animation file name, extension selects the format.
+        :param frame_duration: seconds per frame.
+        :param keep_frames: save every frame as PNG as well.
+        :param history: number of recent frames kept in memory for repeat_last.
+        """
+        self.out_directory = out_directory
+        self.out_name = out_name
+        self.frame_duration = frame_duration
+        self.keep_frames = keep_frames
+        self.frame_paths = []
+        self.frames_count = 0
+        self._recent = collections.deque(maxlen=history)
+        self._writer = None
+
+    @property
+    def out_path(self) -> str:
+        return os.path.join(self.out_directory, self.out_name)
+
+    @staticmethod
+    def grab(figure: mfigure.Figure, draw: bool = True) -> np.ndarray:
+        """RGB copy of the rendered figure. Without draw the canvas is taken as it is, e.g. right after blitting."""
+        if draw:
+            figure.canvas.draw()
+        return np.array(figure.canvas.buffer_rgba())[..., :3]
+
+    def append(self, figure: mfigure.Figure, draw: bool = True):
+        self.append_frame(self.grab(figure, draw))
+
+    def append_frame(self, frame: np.ndarray):
+        if self._writer is None:
+            self._writer = open_writer(self.out_path, self.frame_duration)
+        self._writer.append_data(frame)
+        self._recent.append(frame)
+        self.frames_count += 1
+        if self.keep_frames:
+            file_name = os.path.join(self.out_directory, '{num:0>5}.png'.format(num=self.frames_count))
+            iio.imwrite(file_name, frame)
+            self.frame_paths.append(file_name)
+
+    def repeat_last(self, n: int = 1, times: int = 1):
+        """Append n most recent frames again, times times. Only frames within history are available."""
+        if n > len(self._recent):
+            LOGGER.warning('Only {k} recent frames are kept, repeating those.'.format(k=len(self._recent)))
+        recent = list(self._recent)[-n:]
+        for _ in range(times):
+            for frame in recent:
+                self.append_frame(frame)
+
+    def finish(self, out_name: Optional[str] = None, frame_duration: Optional[float] = None) -> Optional[str]:
+        """Close the writer and return animation path.
+
+        Name or frame duration differing from the streamed ones need the frames again, so they are only honoured
+        with keep_frames, by encoding the kept PNG files once more.
+        """
+        if self._writer is None:
+            LOGGER.info('No frames were saved, animation was not created.')
+            return None
+        self._writer.close()
+        self._writer = None
+        out_name = self.out_name if out_name is None else out_name
+        frame_duration = self.frame_duration if frame_duration is None else frame_duration
+        if frame_duration != self.frame_duration:
+            if self.keep_frames:
+                encode_files(self.frame_paths, os.path.join(self.out_directory, out_name), frame_duration)
+                return os.path.join(self.out_directory, out_name)
+            LOGGER.warning('Frames were not kept, animation keeps frame duration of {d} s.'.format(
+                d=self.frame_duration
+            ))
+        if out_name != self.out_name:
+            os.replace(self.out_path, os.path.join(self.out_directory, out_name))
+        return os.path.join(self.out_directory, out_name)
+
+
+class FrameCollector:
+    """Keeps frames in memory instead of encoding them, e.g. in worker processes rendering part of an animation.
+    Stands in for FrameSink as frame_sink of plotting engines."""
+
+    frames: List[np.ndarray]
+
+    def __init__(self):
+        self.frames = []
+
+    def append(self, figure: mfigure.Figure, draw: bool = True):
+        self.frames.append(FrameSink.grab(figure, draw))
@@ -0,0 +1,56 @@
+import functools
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+Shift = Tuple[int, int]
+
+
+class NeighbourTable(NamedTuple):
+    """Neighbours of every site of width x height lattice in CSR form, sites are numbered x * height + y.
+
+    Neighbours of site i are indices[indptr[i]:indptr[i + 1]], sorted and without repetitions. Arrays are read only,
+    since a single table is shared by all models of the same topology.
+    """
+
+    width: int
+    height: int
+    indptr: np.ndarray
+    indices: np.ndarray
+
+    def site(self, x: int, y: int) -> int:
+        return x * self.height + y
+
+    def rows(self) -> List[List[int]]:
+        """Neighbour lists of all sites, e.g. for linking objects stored by site."""
+        indptr, indices = self.indptr.tolist(), self.indices.tolist()
+        return [indices[indptr[site]:indptr[site + 1]] for site in range(self.width * self.height)]
+
+
+@functools.lru_cache(maxsize=16)
+def neighbour_table(
+        width: int, height: int, shifts: Tuple[Shift, ...],
+        wrap_left: bool = True, wrap_right: bool = True, wrap_bottom: bool = True, wrap_top: bool = True
+) -> NeighbourTable:
+    """Table of a lattice topology, built once and shared by every caller asking for the same one.
+
+    Shift leading beyond a side that does not wrap gives no neighbour. Shifts are to be passed as sorted tuple, so
+    equal neighbourhoods hit the cache.
+    """
+    xs, ys = np.divmod(np.arange(width * height), height)
+    targets = np.full((width * height, len(shifts)), -1, dtype=np.int64)
+    for column, (x_off, y_off) in enumerate(shifts):
+        x, y = xs + x_off, ys + y_off
+        valid = ((x >= 0) | wrap_left) & ((x < width) | wrap_right)
+        valid &= ((y >= 0) | wrap_bottom) & ((y < height) | wrap_top)
+        targets[valid, column] = (x[valid] % width) * height + y[valid] % height
+    # On lattices not wider than the neighbourhood two shifts can wrap onto the same site, which is linked once.
+    targets.sort(axis=1)
+    targets[:, 1:][targets[:, 1:] == targets[:, :-1]] = -1
+    linked = targets >= 0
+    indptr = np.zeros(width * height + 1, dtype=np.int64)
+    np.cumsum(linked.sum(axis=1), out=indptr[1:])
+    indices = targets[linked]
+    indptr.flags.writeable = False
+    indices.flags.writeable = False
+    return NeighbourTable(width, height, indptr, indices)
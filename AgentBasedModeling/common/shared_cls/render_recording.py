@@ -0,0 +1,107 @@
+import argparse
+import concurrent.futures as cf
+import os
+import tempfile
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+
+import AgentBasedModeling.common.log.logger as log
+import AgentBasedModeling.common.shared_cls.frame_sink as fs
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
+
+LOGGER = log.get_logger(__name__)
+
+
+def frame_ranges(frames_count: int, frames_per_task: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + frames_per_task, frames_count)) for start in range(0, frames_count, frames_per_task)]
+
+
+def render_range(recording_path: str, start: int, stop: int) -> List[np.ndarray]:
+    """Draw frames [start, stop) of the recording with a fresh plotting engine and return them as RGB arrays."""
+    matplotlib.use('Agg')
+    recording = sr.StateRecording(recording_path)
+    engine_class = recording.engine_class()
+    with tempfile.TemporaryDirectory() as out_directory:
+        engine = engine_class.from_recording(recording, os.path.join(out_directory, 'replay'))
+        engine.frame_sink = fs.FrameCollector()
+        if engine.history_fields:
+            for frame in recording.frames(0, start, engine.history_fields):
+                engine.skip_recorded(frame)
+        for frame in recording.frames(start, stop):
+            engine.draw_recorded(frame)
+        plt.close(engine.figure)
+    return engine.frame_sink.frames
+
+
+def _encode(writer, rendered: Iterable[List[np.ndarray]], ranges_count: int):
+    for done, frames in enumerate(rendered, start=1):
+        for frame in frames:
+            writer.append_data(frame)
+        LOGGER.debug('Encoded frame range {done}/{total}.'.format(done=done, total=ranges_count))
+
+
+def render_recording(
+        recording_path: str, out_path: str, frame_duration: Optional[float] = None, workers: Optional[int] = None,
+        frames_per_task: int = 32
+) -> str:
+    """Render animation of a recording, frame ranges are drawn by a process pool and encoded in order.
+
+    :param recording_path: StateRecorder output.
+    :param out_path: animation file, extension selects the format.
+    :param frame_duration: seconds per frame, frame_duration of the plotting engine if None.
+    :param workers: number of processes, all CPUs if None.
+    :param frames_per_task: frames drawn by a single task, every task sets up its own figure.
+    """
+    recording = sr.StateRecording(recording_path)
+    if frame_duration is None:
+        frame_duration = recording.engine_class().frame_duration
+    ranges = frame_ranges(len(recording), max(frames_per_task, 1))
+    starts, stops = [start for start, _ in ranges], [stop for _, stop in ranges]
+    paths = [recording_path] * len(ranges)
+    workers = workers or os.cpu_count() or 1
+    with fs.open_writer(out_path, frame_duration) as writer:
+        if workers == 1:
+            _encode(writer, map(render_range, paths, starts, stops), len(ranges))
+        else:
+            with cf.ProcessPoolExecutor(max_workers=workers) as executor:
+                # map yields in order of ranges, so frames are encoded in order as soon as their range is done.
+                _encode(writer, executor.map(render_range, paths, starts, stops), len(ranges))
+    LOGGER.info('Rendered {n} frames into {path}.'.format(n=len(recording), path=out_path))
+    return out_path
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Render animation of a model state recording.')
+    arg_parser.add_argument('recording', help='Recording directory or HDF5 file.')
+    arg_parser.add_argument(
+        '--out_path', '-o',
+        action='store', required=False, default=None,
+        help='Animation file, <recording>.gif by default.'
+    )
+    arg_parser.add_argument(
+        '--workers', '-w',
+        action='store', required=False, default=None, type=int,
+        help='Number of rendering processes, all CPUs by default.'
+    )
+    arg_parser.add_argument(
+        '--frames_per_task', '-f',
+        action='store', required=False, default=32, type=int,
+        help='Frames rendered by a single task.'
+    )
+    arg_parser.add_argument(
+        '--frame_duration', '-d',
+        action='store', required=False, default=None, type=float,
+        help='Seconds per frame, plotting engine default if not given.'
+    )
+    args = arg_parser.parse_args()
+    out_path = args.out_path
+    if out_path is None:
+        out_path = os.path.splitext(args.recording.rstrip(os.sep))[0] + '.gif'
+    render_recording(args.recording, out_path, args.frame_duration, args.workers, args.frames_per_task)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,55 @@
 import os
 import time
-from typing import Tuple, Iterable, Dict, Set
+from typing import Tuple, Iterable, Dict, Set, List, Optional
 
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import matplotlib.gridspec as grd
+import matplotlib.colors as mcolors
+import matplotlib.artist as martist
+import matplotlib.image as mimage
 import AgentBasedModeling.common.log.logger as log
-import imageio as iio
+import AgentBasedModeling.common.shared_cls.frame_sink as fs
+import AgentBasedModeling.common.shared_cls.frame_pipeline as fp
 
 LOGGER = log.get_logger(__name__)
 
 
-class SquareLatticePlotter:
+PATCHES_BACKEND = 'patches'
+RASTER_BACKEND = 'raster'
 
+
+def mask_positions(mask: np.ndarray) -> Set[Tuple[int, int]]:
+    """Sites of boolean lattice indexed [x, y] that are set, e.g. of a recorded frame."""
+    return set(map(tuple, np.argwhere(mask).tolist()))
+
+
+class SquareLatticePlotter(fp.BackgroundRendering):
+    """Lattice drawn on the main axes of a figure, every saved frame goes to out_directory.
+
+    Patches backend keeps one Rectangle per site. Raster backend keeps the whole lattice as a single RGBA image and
+    blits: the static part of the figure is rendered once and cached, every frame only restores it and draws the
+    image together with overlays on top. Backend is taken from class attribute at construction, so
+    SquareLatticePlotter.use_backend(RASTER_BACKEND) switches all plotting engines at once.
+
+    Saved frames are streamed from the canvas buffer into the animation by FrameSink, PNG files are written only
+    when keep_frames is set. Frames may be rendered in background, see BackgroundRendering.
+    """
+
+    backend: str = PATCHES_BACKEND
+    frame_duration: float = 0.8
+    keep_frames: bool = False
+    frame_sink: Optional[fs.FrameSink]
     rectangles: Dict[Tuple[int, int], patches.Rectangle]
     _temporary_rectangles: Set[patches.Rectangle]
     _images_created_counter: int
+    _raster: Optional[np.ndarray]
+    _image: Optional[mimage.AxesImage]
+    _overlays: List[martist.Artist]
 
     def __init__(self, grid_length: int, fig_size: Tuple[float, float], out_directory: 'str'):
+        self.backend = type(self).backend
         self.grid_length = grid_length
         self.figure = plt.figure(figsize=fig_size)
         self.grid = grd.GridSpec(2, 3)
@@ -27,7 +59,54 @@ class SquareLatticePlotter:
         self._images_created_counter = 0
         self._out_directory = out_directory
         self.font_size = fig_size[1] * self.figure.dpi // 80
-        self._images_file_paths = []
+        self.frame_sink = None
+        self._raster = None
+        self._image = None
+        self._overlays = []
+        self._background = None
+
+    @classmethod
+    def use_backend(cls, backend: str):
+        if backend not in (PATCHES_BACKEND, RASTER_BACKEND):
+            raise ValueError('Unknown plotting backend {b}.'.format(b=backend))
+        cls.backend = backend
+
+    @property
+    def is_raster(self) -> bool:
+        return self.backend == RASTER_BACKEND
+
+    def _ensure_raster(self):
+        """Create the lattice image on first use, its size is taken from limits set by create_checker_board."""
+        if self._raster is not None:
+            return
+        x_low, x_high = self.base_axis.get_xlim()
+        y_low, y_high = self.base_axis.get_ylim()
+        width, height = int(round(x_high - x_low)), int(round(y_high - y_low))
+        self._raster = np.zeros((height, width, 4))
+        self._image = self.base_axis.imshow(
+            self._raster, origin='lower', interpolation='nearest', animated=True,
+            extent=(x_low, x_high, y_low, y_high)
+        )
+        self.base_axis.set_xlim(x_low, x_high)
+        self.base_axis.set_ylim(y_low, y_high)
+        self.base_axis.set_aspect('auto')
+
+    def _paint(self, coords: Iterable[Tuple[int, int]], color):
+        coords = np.array(list(coords), dtype=int).reshape(-1, 2)
+        if coords.size:
+            self._ensure_raster()
+            self._raster[coords[:, 1], coords[:, 0]] = mcolors.to_rgba(color)
+
+    def add_overlay_patch(self, axes: plt.Axes, patch: patches.Patch):
+        """Patch shown until the next clear_main_axes. Raster backend only draws it over the cached background, so
+        adding it does not force the whole figure to be rendered again."""
+        if not self.is_raster:
+            axes.add_patch(patch)
+            return
+        patch.set_figure(self.figure)
+        patch.set_transform(axes.transData)
+        patch.set_clip_path(axes.patch)
+        self._overlays.append(patch)
 
     def handle_out_directory(self):
         tries = 1
@@ -60,6 +139,9 @@ class SquareLatticePlotter:
         self.base_axis.set_yticks([])
 
     def add_permanent_rectangles(self, coords: Iterable[Tuple[int, int]]):
+        if self.is_raster:
+            self._paint(coords, patches.Rectangle((0, 0), 1, 1).get_facecolor())
+            return
         for x, y in coords:
             self.rectangles[(x, y)] = patches.Rectangle(
                 (x - 0.5, y - 0.5), 1, 1, fill=True
@@ -75,27 +157,56 @@ class SquareLatticePlotter:
                 (x - x_off/2, y - y_off/2), x_off, y_off, fill=True, color=color, alpha=alpha
             )
             self._temporary_rectangles.add(tmp)
-            self.base_axis.add_patch(tmp)
+            self.add_overlay_patch(self.base_axis, tmp)
 
     def clear_main_axes(self):
-        self.base_axis.patches = [patch for _, patch in self.rectangles.items()]
+        if not self.is_raster:
+            for tmp in self._temporary_rectangles:
+                tmp.remove()
         self._temporary_rectangles = set()
+        self._overlays = []
 
     def colour_rectangles(self, coords: Iterable[Tuple[int, int]], color: str):
+        if self.is_raster:
+            self._paint(coords, color)
+            return
         for x, y in coords:
             self.rectangles[(x, y)].set_color(color)
 
+    def _blit(self):
+        """Render static artists only when some of them changed, otherwise restore them from the cache."""
+        canvas = self.figure.canvas
+        self._ensure_raster()
+        self._image.set_data(self._raster)
+        if self._background is None or self.figure.stale:
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.figure.bbox)
+        else:
+            canvas.restore_region(self._background)
+        self.figure.draw_artist(self._image)
+        # Grid lines lie under the image in the cached background, so they are drawn again on top of it.
+        for collection in self.base_axis.collections:
+            self.figure.draw_artist(collection)
+        for overlay in self._overlays:
+            self.figure.draw_artist(overlay)
+        canvas.blit(self.figure.bbox)
+
     def save(self):
-        self.figure.canvas.draw()
         self._images_created_counter += 1
-        file_name = os.path.join(self._out_directory, '{num:0>5}.png'.format(num=self._images_created_counter))
-        self.figure.savefig(file_name)
-        self._images_file_paths.append(file_name)
-
-    def animate(self, out_name: str = 'animation.gif', frame_duration=0.8):
-        with iio.get_writer(os.path.join(self._out_directory, out_name), mode='I', duration=frame_duration) as w:
-            for file in self._images_file_paths:
-                w.append_data(iio.imread(file))
+        if self.frame_sink is None:
+            self.frame_sink = fs.FrameSink(
+                self._out_directory, frame_duration=self.frame_duration, keep_frames=self.keep_frames
+            )
+        if self.is_raster:
+            self._blit()
+            self.frame_sink.append(self.figure, draw=False)
+        else:
+            self.frame_sink.append(self.figure)
+
+    def animate(self, out_name: str = 'animation.gif', frame_duration: Optional[float] = None):
+        self.close_frames()
+        if self.frame_sink is not None:
+            self.frame_sink.finish(out_name, frame_duration)
 
 
 if __name__ == '__main__':
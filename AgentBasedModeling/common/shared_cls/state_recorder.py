@@ -0,0 +1,219 @@
+import abc
+import importlib
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+import AgentBasedModeling.common.log.logger as log
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+LOGGER = log.get_logger(__name__)
+
+HDF5_EXTENSIONS = ('.h5', '.hdf5')
+METADATA_FILE = 'metadata.json'
+CHUNK_TEMPLATE = 'chunk_{num:0>5}.npz'
+
+Frame = Dict[str, np.ndarray]
+
+
+def is_hdf5(path: str) -> bool:
+    return path.lower().endswith(HDF5_EXTENSIONS)
+
+
+def _require_h5py():
+    if h5py is None:
+        raise ImportError('Recording into HDF5 file needs h5py, use a directory path to record into npz chunks.')
+
+
+class StateRecorder:
+    """Stores model state of every stride-th recorded step in compressed chunks, to be drawn later.
+
+    Path ending with .h5 or .hdf5 is a single HDF5 file with one gzip compressed, resizable dataset per field (needs
+    h5py), any other path is a directory of compressed npz chunks with metadata.json beside them. Steps are buffered
+    in memory until chunk_size of them is collected, so a recording costs one write per chunk. Every field has to
+    keep its shape and dtype for the whole recording.
+    """
+
+    _buffer: Dict[str, List[np.ndarray]]
+    _chunks: List[int]
+
+    def __init__(self, path: str, stride: int = 1, chunk_size: int = 64):
+        """
+        :param path: HDF5 file or directory of npz chunks, must not exist yet.
+        :param stride: only every stride-th call of record is stored.
+        :param chunk_size: number of stored steps written at once.
+        """
+        if stride < 1 or chunk_size < 1:
+            raise ValueError('Stride and chunk size must be positive, got {s} and {c}.'.format(s=stride, c=chunk_size))
+        if os.path.exists(path):
+            raise ValueError('Recording {path} exists already.'.format(path=path))
+        self.path = path
+        self.stride = stride
+        self.chunk_size = chunk_size
+        self.metadata = {}
+        self.steps_seen = 0
+        self.frames_count = 0
+        self._buffer = {}
+        self._steps = []
+        self._chunks = []
+        self._file = None
+        if is_hdf5(path):
+            _require_h5py()
+            self._file = h5py.File(path, 'w')
+        else:
+            os.makedirs(path)
+
+    def describe(self, engine: type, **metadata: Any):
+        """Name plotting engine able to draw the recording (see RecordedReplay) and everything it needs for that.
+        Metadata must be JSON serializable, repeated calls update it."""
+        self.metadata['engine'] = '{module}.{name}'.format(module=engine.__module__, name=engine.__qualname__)
+        self.metadata.update(metadata)
+
+    def record(self, **fields: Any):
+        """Offer state of a single step, stored only on every stride-th call. Values are copied."""
+        step = self.steps_seen
+        self.steps_seen += 1
+        if step % self.stride:
+            return
+        if self._buffer and fields.keys() != self._buffer.keys():
+            raise ValueError('Recorded fields changed from {old} to {new}.'.format(
+                old=sorted(self._buffer), new=sorted(fields)
+            ))
+        for name, value in fields.items():
+            self._buffer.setdefault(name, []).append(np.array(value))
+        self._steps.append(step)
+        if len(self._steps) == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._steps:
+            return
+        stacked = {name: np.stack(values) for name, values in self._buffer.items()}
+        stacked['step'] = np.array(self._steps)
+        if self._file is None:
+            np.savez_compressed(
+                os.path.join(self.path, CHUNK_TEMPLATE.format(num=len(self._chunks))), **stacked
+            )
+        else:
+            self._append_datasets(stacked)
+        self._chunks.append(len(self._steps))
+        self.frames_count += len(self._steps)
+        self._buffer = {name: [] for name in self._buffer}
+        self._steps = []
+
+    def _append_datasets(self, stacked: Frame):
+        for name, values in stacked.items():
+            if name not in self._file:
+                self._file.create_dataset(
+                    name, data=values, maxshape=(None, *values.shape[1:]), chunks=True, compression='gzip'
+                )
+                continue
+            dataset = self._file[name]
+            dataset.resize(dataset.shape[0] + values.shape[0], axis=0)
+            dataset[-values.shape[0]:] = values
+
+    def close(self):
+        self.flush()
+        summary = dict(
+            metadata=self.metadata, stride=self.stride, chunk_size=self.chunk_size, frames_count=self.frames_count,
+            chunks=self._chunks
+        )
+        if self._file is None:
+            with open(os.path.join(self.path, METADATA_FILE), 'w') as f:
+                json.dump(summary, f)
+        else:
+            self._file.attrs['recording'] = json.dumps(summary)
+            self._file.close()
+            self._file = None
+        LOGGER.info('Recorded {n} frames into {path}.'.format(n=self.frames_count, path=self.path))
+
+    def __enter__(self) -> 'StateRecorder':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class StateRecording:
+    """Read access to a closed StateRecorder output, frames are loaded chunk by chunk."""
+
+    metadata: Dict[str, Any]
+    chunks: List[int]
+
+    def __init__(self, path: str):
+        self.path = path
+        if is_hdf5(path):
+            _require_h5py()
+            with h5py.File(path, 'r') as f:
+                summary = json.loads(f.attrs['recording'])
+        else:
+            with open(os.path.join(path, METADATA_FILE)) as f:
+                summary = json.load(f)
+        self.metadata = summary['metadata']
+        self.stride = summary['stride']
+        self.chunk_size = summary['chunk_size']
+        self.frames_count = summary['frames_count']
+        self.chunks = summary['chunks']
+
+    def __len__(self) -> int:
+        return self.frames_count
+
+    def engine_class(self) -> type:
+        module_name, class_name = self.metadata['engine'].rsplit('.', 1)
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def frames(
+            self, start: int = 0, stop: Optional[int] = None, fields: Optional[Sequence[str]] = None
+    ) -> Iterator[Frame]:
+        """Frames of [start, stop) range as dicts of field arrays, 'step' holds the simulation step of the frame.
+        Only given fields are loaded, if any."""
+        stop = self.frames_count if stop is None else min(stop, self.frames_count)
+        if is_hdf5(self.path):
+            yield from self._hdf5_frames(start, stop, fields)
+            return
+        chunk_start = 0
+        for num, length in enumerate(self.chunks):
+            chunk_stop = chunk_start + length
+            if chunk_stop > start and chunk_start < stop:
+                with np.load(os.path.join(self.path, CHUNK_TEMPLATE.format(num=num))) as chunk:
+                    names = chunk.files if fields is None else fields
+                    arrays = {name: chunk[name] for name in names}
+                for i in range(max(start, chunk_start) - chunk_start, min(stop, chunk_stop) - chunk_start):
+                    yield {name: values[i] for name, values in arrays.items()}
+            chunk_start = chunk_stop
+
+    def _hdf5_frames(self, start: int, stop: int, fields: Optional[Sequence[str]]) -> Iterator[Frame]:
+        with h5py.File(self.path, 'r') as f:
+            names = list(f.keys()) if fields is None else fields
+            for block_start in range(start, stop, self.chunk_size):
+                block_stop = min(block_start + self.chunk_size, stop)
+                arrays = {name: f[name][block_start:block_stop] for name in names}
+                for i in range(block_stop - block_start):
+                    yield {name: values[i] for name, values in arrays.items()}
+
+
+class RecordedReplay(abc.ABC):
+    """Mixin of plotting engines able to draw frames of a StateRecording.
+
+    from_recording builds the engine from recording metadata (and its first frames, if needed). Frames can be drawn
+    out of order by several engines at once, so engine state carried between frames (such as history plots) is
+    restored by skip_recorded from frames before the drawn range, which only have history_fields loaded.
+    """
+
+    history_fields: Sequence[str] = ()
+
+    @classmethod
+    @abc.abstractmethod
+    def from_recording(cls, recording: StateRecording, out_directory: str) -> 'RecordedReplay': ...
+
+    @abc.abstractmethod
+    def draw_recorded(self, frame: Frame): ...
+
+    def skip_recorded(self, frame: Frame):
+        pass
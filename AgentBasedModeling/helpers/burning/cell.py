@@ -1,5 +1,9 @@
 from typing import Tuple
 
+# Codes of cell states in lattice arrays, shared by array based engines and recordings.
+EMPTY, TREE, BURNING, BURNED = 0, 1, 2, 3
+STATE_CODES = {'empty': EMPTY, 'tree': TREE, 'burning': BURNING, 'burned': BURNED}
+
 
 class Cell:
 
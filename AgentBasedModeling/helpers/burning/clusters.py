@@ -0,0 +1,121 @@
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+
+class ClusterReport(NamedTuple):
+    """Result of cluster labelling of a lattice indexed by [x, y].
+
+    labels: 0 for unoccupied sites, clusters are numbered 1..n.
+    sizes: sizes[label] is number of sites in cluster, sizes[0] is 0.
+    size_histogram: size_histogram[s] is number of clusters having exactly s sites.
+    spanning_labels: labels of clusters joining row y = 0 with row y = L - 1.
+    """
+
+    labels: np.ndarray
+    sizes: np.ndarray
+    size_histogram: np.ndarray
+    spanning_labels: np.ndarray
+
+    @property
+    def clusters_count(self) -> int:
+        return len(self.sizes) - 1
+
+    @property
+    def biggest(self) -> int:
+        return int(self.sizes.max(initial=0))
+
+    @property
+    def is_spanning(self) -> bool:
+        return bool(self.spanning_labels.size)
+
+
+def _compress(parent: np.ndarray) -> np.ndarray:
+    """Path compression, every label ends up pointing directly at its root."""
+    while True:
+        grand_parent = parent[parent]
+        if np.array_equal(grand_parent, parent):
+            return parent
+        parent[:] = grand_parent
+
+
+def _union(parent: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Merge classes of all label pairs. Roots are always hooked under the smaller label, so no cycles appear."""
+    while first.size:
+        _compress(parent)
+        first_roots, second_roots = parent[first], parent[second]
+        unresolved = first_roots != second_roots
+        first, second = first[unresolved], second[unresolved]
+        np.minimum.at(
+            parent,
+            np.maximum(first_roots[unresolved], second_roots[unresolved]),
+            np.minimum(first_roots[unresolved], second_roots[unresolved])
+        )
+    return _compress(parent)
+
+
+def _label_dtype(n: int):
+    return np.int32 if n < np.iinfo(np.int32).max else np.int64
+
+
+def _run_links(provisional: np.ndarray, occupied: np.ndarray, connectivity: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Equivalences between runs of neighbouring rows. Only the first column of each run overlap is kept."""
+    touching = occupied[:-1, :] & occupied[1:, :]
+    first_touch = touching.copy()
+    first_touch[:, 1:] &= ~touching[:, :-1]
+    lower = [provisional[:-1, :][first_touch]]
+    upper = [provisional[1:, :][first_touch]]
+    if connectivity == 8:
+        diagonal = occupied[:-1, :-1] & occupied[1:, 1:]
+        lower.append(provisional[:-1, :-1][diagonal])
+        upper.append(provisional[1:, 1:][diagonal])
+        anti_diagonal = occupied[:-1, 1:] & occupied[1:, :-1]
+        lower.append(provisional[:-1, 1:][anti_diagonal])
+        upper.append(provisional[1:, :-1][anti_diagonal])
+    return np.concatenate(lower), np.concatenate(upper)
+
+
+def label_clusters(occupied: np.ndarray, connectivity: int = 4) -> ClusterReport:
+    """Hoshen-Kopelman labelling done in a single pass over the lattice.
+
+    Runs of occupied sites along each row get provisional labels, links between runs of consecutive rows are
+    merged with union-find and provisional labels are rewritten to consecutive cluster numbers.
+
+    :param occupied: boolean lattice indexed by [x, y].
+    :param connectivity: 4 for von Neumann neighbours, 8 for Moore neighbours.
+    :return: labels, cluster sizes, their histogram and clusters spanning y direction.
+    """
+    if connectivity not in (4, 8):
+        raise ValueError('Connectivity must be either 4 or 8, got {c}.'.format(c=connectivity))
+    occupied = np.asarray(occupied, dtype=bool)
+    run_starts = occupied.copy()
+    run_starts[:, 1:] &= ~occupied[:, :-1]
+    runs_count = int(np.count_nonzero(run_starts))
+    dtype = _label_dtype(runs_count)
+    provisional = np.cumsum(run_starts, dtype=dtype).reshape(occupied.shape)
+    provisional *= occupied
+
+    parent = np.arange(runs_count + 1, dtype=dtype)
+    _union(parent, *_run_links(provisional, occupied, connectivity))
+    roots, final = np.unique(parent[1:], return_inverse=True)
+    relabel = np.zeros(runs_count + 1, dtype=dtype)
+    relabel[1:] = final.reshape(-1) + 1
+    labels = relabel[provisional]
+
+    sizes = np.bincount(labels.ravel(), minlength=len(roots) + 1)
+    sizes[0] = 0
+    spanning = np.intersect1d(labels[:, 0], labels[:, -1])
+    return ClusterReport(
+        labels=labels,
+        sizes=sizes,
+        size_histogram=np.bincount(sizes[1:], minlength=1),
+        spanning_labels=spanning[spanning != 0]
+    )
+
+
+def graph_components(nodes_count: int, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Root node of every node of a graph given by its edges first[i] - second[i], merged the same way as runs in
+    label_clusters, so the root is always the smallest node of the component."""
+    dtype = _label_dtype(nodes_count)
+    parent = np.arange(nodes_count, dtype=dtype)
+    return _union(parent, np.asarray(first, dtype=dtype), np.asarray(second, dtype=dtype))
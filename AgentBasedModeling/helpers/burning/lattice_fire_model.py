@@ -0,0 +1,393 @@
+from typing import NamedTuple, Optional, Set, Tuple, Union
+
+import numpy as np
+
+import AgentBasedModeling.helpers.burning.forest_fire_model as ffm
+import AgentBasedModeling.helpers.burning.cell as cell
+import AgentBasedModeling.helpers.burning.wind as wind
+import AgentBasedModeling.helpers.burning.clusters as clusters
+import AgentBasedModeling.helpers.burning.plt_engine as pe
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
+import AgentBasedModeling.common.log.logger_dec as ld
+import AgentBasedModeling.common.log.logger as logger
+
+LOGGER = logger.get_logger(__name__)
+
+EMPTY, TREE, BURNING, BURNED = cell.EMPTY, cell.TREE, cell.BURNING, cell.BURNED
+STATE_CODES = cell.STATE_CODES
+
+# Wind shifts the 3x3 ignition square by at most one cell, so its footprint fits in a 5x5 window.
+KERNEL_REACH = 2
+
+
+def ignition_kernel(dx: Union[float, np.ndarray], dy: Union[float, np.ndarray]) -> np.ndarray:
+    """Ignition probabilities spread by a single burning cell, indexed by [..., x offset + 2, y offset + 2].
+
+    Each weight is the overlap area of a unit cell with the 3x3 square centred at (dx, dy), which is exactly what
+    ForestFireModel.IgnitionSpot._calculate_ignition_probability assigns to the cells it affects. Arrays of
+    centers give one kernel per center.
+    """
+    offsets = np.arange(-KERNEL_REACH, KERNEL_REACH + 1)
+    dx, dy = np.asarray(dx, dtype=float)[..., None], np.asarray(dy, dtype=float)[..., None]
+    x_weights = np.clip(np.minimum(offsets + 0.5, dx + 1.5) - np.maximum(offsets - 0.5, dx - 1.5), 0, None)
+    y_weights = np.clip(np.minimum(offsets + 0.5, dy + 1.5) - np.maximum(offsets - 0.5, dy - 1.5), 0, None)
+    return x_weights[..., :, None] * y_weights[..., None, :]
+
+
+def _shift_slices(shift: int, length: int) -> Tuple[slice, slice]:
+    if shift >= 0:
+        return slice(shift, length), slice(0, length - shift)
+    return slice(0, length + shift), slice(-shift, length)
+
+
+def ignition_field(burning: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """Scatter-add kernel over every burning cell of the last two axes. Spill over lattice edges is dropped.
+
+    Kernel of shape (5, 5) is shared by all leading axes, kernel of shape (replicas, 5, 5) gives each of the
+    replicas along the first axis of burning its own one.
+    """
+    field = np.zeros(burning.shape, dtype=float)
+    source = burning.astype(float)
+    x_len, y_len = burning.shape[-2:]
+    used_offsets = kernel.reshape(-1, *kernel.shape[-2:]).any(axis=0)
+    for i, j in zip(*np.nonzero(used_offsets)):
+        x_dst, x_src = _shift_slices(i - KERNEL_REACH, x_len)
+        y_dst, y_src = _shift_slices(j - KERNEL_REACH, y_len)
+        weight = kernel[..., i, j]
+        if weight.ndim:
+            weight = weight[:, None, None]
+        field[..., x_dst, y_dst] += weight * source[..., x_src, y_src]
+    return field
+
+
+def wind_center(
+        wind_state: wind.Wind, wind_trajectory: Optional[np.ndarray], step: int
+) -> Tuple[Union[float, np.ndarray], Union[float, np.ndarray]]:
+    """Propagation center for given step. Trajectory shorter than the fire keeps its last value."""
+    if wind_trajectory is None:
+        return wind_state.get_wind_propagation_center()
+    center = wind_trajectory[..., min(step, wind_trajectory.shape[-2] - 1), :]
+    return center[..., 0], center[..., 1]
+
+
+def bounding_window(mask: np.ndarray, x_offset: int, y_offset: int) -> Optional[Tuple[int, int, int, int]]:
+    """Smallest (x_start, x_stop, y_start, y_stop) window holding all set cells of 2D mask, None if there are none."""
+    xs = np.flatnonzero(mask.any(axis=1))
+    if not xs.size:
+        return None
+    ys = np.flatnonzero(mask.any(axis=0))
+    return x_offset + xs[0], x_offset + xs[-1] + 1, y_offset + ys[0], y_offset + ys[-1] + 1
+
+
+class LatticeForestFireModel:
+    """Array backed counterpart of ForestFireModel.
+
+    Lattice is kept as uint8 array indexed by [x, y] with the same orientation as ForestFireModel.cells, so fire
+    starts at y = 0 and percolation is checked at y = edge_length - 1. Wind is taken from wind_state, process wide
+    SharedWind if none is given, unless wind_trajectory of (steps, 2) propagation centers is provided.
+    """
+
+    state: np.ndarray
+    wind_state: wind.Wind
+    wind_trajectory: Optional[np.ndarray]
+    _window: Optional[Tuple[int, int, int, int]]
+    _plotting_engine: Optional[pe.PlottingEngine]
+    _recorder: Optional[sr.StateRecorder]
+
+    def __init__(
+            self, lattice_size: int, tree_plant_probability: float,
+            plotting_engine: Optional[pe.PlottingEngine] = None, seed: Optional[int] = None,
+            wind_state: Optional[wind.Wind] = None, wind_trajectory: Optional[np.ndarray] = None
+    ):
+        self.wind_state = wind.SharedWind() if wind_state is None else wind_state
+        self.wind_trajectory = wind_trajectory
+        self.edge_length = lattice_size
+        self.plant_prob = tree_plant_probability
+        self.state = np.zeros((lattice_size, lattice_size), dtype=np.uint8)
+        self._rng = np.random.default_rng(seed)
+        self._time_counter = 0
+        self._window = None
+        self._ignition_centers = set()
+        self.plotting_engine = plotting_engine
+        self.recorder = None
+
+    @property
+    def plant_prob(self):
+        return self._plant_prob
+
+    @plant_prob.setter
+    def plant_prob(self, set_val: float):
+        self._plant_prob = min(max(set_val, 0), 1)
+
+    @property
+    def plotting_engine(self):
+        return self._plotting_engine
+
+    @plotting_engine.setter
+    def plotting_engine(self, eng: Optional[pe.PlottingEngine]):
+        self._plotting_engine = eng
+        if eng is not None:
+            self._plotting_engine.prepare(self.plant_prob)
+
+    @property
+    def recorder(self) -> Optional[sr.StateRecorder]:
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, rec: Optional[sr.StateRecorder]):
+        self._recorder = rec
+        if rec is not None:
+            rec.describe(pe.PlottingEngine, lattice_size=self.edge_length, plant_probability=self.plant_prob)
+
+    def _positions(self, state_code: int) -> Set[Tuple[int, int]]:
+        return set(map(tuple, np.argwhere(self.state == state_code).tolist()))
+
+    @property
+    def living(self) -> Set[Tuple[int, int]]:
+        return self._positions(TREE)
+
+    @property
+    def burning(self) -> Set[Tuple[int, int]]:
+        return self._positions(BURNING)
+
+    @property
+    def burned(self) -> Set[Tuple[int, int]]:
+        return self._positions(BURNED)
+
+    @property
+    def non_empty_cells(self) -> Set[Tuple[int, int]]:
+        return set(map(tuple, np.argwhere(self.state != EMPTY).tolist()))
+
+    def propagate_trees_to_plotting_engine(self):
+        if self.plotting_engine is not None:
+            self.plotting_engine.submit(
+                self.plotting_engine.draw_forest, self.plotting_engine.translate_iterable(self.non_empty_cells)
+            )
+
+    def process_plotting_engine(self):
+        if self.plotting_engine is not None:
+            self.plotting_engine.submit_snapshot(pe.FireSnapshot.of(
+                self.burning, self.burned, self._ignition_centers, self.wind_state
+            ))
+
+    def process_recorder(self, spreading: bool = True):
+        if self.recorder is not None:
+            self.recorder.record(
+                state=self.state, wind=(self.wind_state.direction, self.wind_state.power),
+                wind_center=wind_center(self.wind_state, self.wind_trajectory, self._time_counter),
+                spreading=spreading
+            )
+
+    def create_cells(self):
+        self.state = np.zeros((self.edge_length, self.edge_length), dtype=np.uint8)
+        self._time_counter = 0
+        self._window = None
+
+    def plant_trees(self):
+        self.state[self._rng.random(self.state.shape) <= self.plant_prob] = TREE
+        self.propagate_trees_to_plotting_engine()
+
+    def start_fire(self):
+        bottom = self.state[:, 0]
+        bottom[bottom == TREE] = BURNING
+        self._window = bounding_window(self.state[:, :1] == BURNING, 0, 0)
+
+    def spread(self):
+        i_spots_x_offset, i_spots_y_offset = wind_center(self.wind_state, self.wind_trajectory, self._time_counter)
+        # New fire can only appear within kernel reach of the current one, so work on that window only.
+        x_start, x_stop, y_start, y_stop = self._window
+        x_start, y_start = max(x_start - KERNEL_REACH, 0), max(y_start - KERNEL_REACH, 0)
+        x_stop, y_stop = min(x_stop + KERNEL_REACH, self.edge_length), min(y_stop + KERNEL_REACH, self.edge_length)
+        window = self.state[x_start:x_stop, y_start:y_stop]
+        currently_burning = window == BURNING
+        if self.plotting_engine is not None:
+            self._ignition_centers = {
+                (x + x_start + i_spots_x_offset, y + y_start + i_spots_y_offset)
+                for x, y in np.argwhere(currently_burning).tolist()
+            }
+        self.process_plotting_engine()
+        self.process_recorder()
+        probability = ignition_field(currently_burning, ignition_kernel(i_spots_x_offset, i_spots_y_offset))
+        ignited = (window == TREE) & (probability > 0)
+        ignited[ignited] = self._rng.random(np.count_nonzero(ignited)) <= probability[ignited]
+        window[currently_burning] = BURNED
+        window[ignited] = BURNING
+        self._window = bounding_window(ignited, x_start, y_start)
+        if self.wind_trajectory is None:
+            self.wind_state.process()
+        self._time_counter += 1
+
+    def burn(self, mode: str = 'full'):
+        """Same modes as ForestFireModel.burn. Top row is a single column of the array, so it is simply checked
+        after every step in percolation mode."""
+        ffm.check_burn_mode(mode)
+        while self._window is not None:
+            if mode == 'percolation' and self.is_top_hit:
+                break
+            self.spread()
+        self.process_recorder(spreading=False)
+        if self.plotting_engine is not None:
+            self._ignition_centers = set()
+            self.process_plotting_engine()
+            self.plotting_engine.animate()
+
+    @property
+    def burn_time(self) -> int:
+        return self._time_counter
+
+    @property
+    def is_top_hit(self) -> bool:
+        return bool((self.state[:, -1] >= BURNING).any())
+
+    def state_array(self, in_state: str = 'burned') -> np.ndarray:
+        return self.state == STATE_CODES[in_state]
+
+    def find_clusters(self, in_state: str = 'burned', connectivity: int = 4) -> clusters.ClusterReport:
+        return clusters.label_clusters(self.state_array(in_state), connectivity)
+
+    @ld.debug_timer_dec(logger=LOGGER)
+    def find_biggest_cluster_by_kh(self, in_state: str = 'burned') -> int:
+        return self.find_clusters(in_state).biggest
+
+    find_biggest_cluster_by_me = find_biggest_cluster_by_kh
+
+    def restore(self):
+        self.state[self.state != EMPTY] = TREE
+        self._time_counter = 0
+        self._window = None
+
+
+class ReplicasResult(NamedTuple):
+    """Per replica outcome of BatchedForestFireModel.run."""
+
+    is_top_hit: np.ndarray
+    burn_time: np.ndarray
+    biggest_cluster: Optional[np.ndarray]
+
+
+class BatchedForestFireModel:
+    """Independent forests simulated together in one (replicas, L, L) state array.
+
+    Replicas whose fire went out are masked out of further steps. Replicas share the wind of a given step, unless
+    wind_trajectory of shape (replicas, steps, 2) gives each of them its own.
+    """
+
+    state: np.ndarray
+    active: np.ndarray
+    burn_times: np.ndarray
+    wind_state: wind.Wind
+    wind_trajectory: Optional[np.ndarray]
+    _window: Optional[Tuple[int, int, int, int]]
+
+    def __init__(
+            self, replicas: int, lattice_size: int, tree_plant_probability: float, seed: Optional[int] = None,
+            wind_state: Optional[wind.Wind] = None, wind_trajectory: Optional[np.ndarray] = None
+    ):
+        self.wind_state = wind.SharedWind() if wind_state is None else wind_state
+        self.wind_trajectory = wind_trajectory
+        self.replicas = replicas
+        self.edge_length = lattice_size
+        self.plant_prob = min(max(tree_plant_probability, 0), 1)
+        self._rng = np.random.default_rng(seed)
+        self.create_cells()
+
+    def create_cells(self):
+        self.state = np.zeros((self.replicas, self.edge_length, self.edge_length), dtype=np.uint8)
+        self.active = np.zeros(self.replicas, dtype=bool)
+        self.burn_times = np.zeros(self.replicas, dtype=int)
+        self._step = 0
+        self._window = None
+        self._stop_at_top = False
+
+    def plant_trees(self):
+        self.state[self._rng.random(self.state.shape) <= self.plant_prob] = TREE
+
+    def start_fire(self):
+        bottom = self.state[:, :, 0]
+        bottom[bottom == TREE] = BURNING
+        self.active = (bottom == BURNING).any(axis=1)
+        self._window = bounding_window(
+            (self.state[:, :, :1] == BURNING).any(axis=0), 0, 0
+        )
+
+    def spread(self):
+        i_spots_x_offset, i_spots_y_offset = wind_center(self.wind_state, self.wind_trajectory, self._step)
+        x_start, x_stop, y_start, y_stop = self._window
+        x_start, y_start = max(x_start - KERNEL_REACH, 0), max(y_start - KERNEL_REACH, 0)
+        x_stop, y_stop = min(x_stop + KERNEL_REACH, self.edge_length), min(y_stop + KERNEL_REACH, self.edge_length)
+        replicas = np.flatnonzero(self.active)
+        window = self.state[replicas, x_start:x_stop, y_start:y_stop]
+        currently_burning = window == BURNING
+        kernel = ignition_kernel(i_spots_x_offset, i_spots_y_offset)
+        if kernel.ndim == 3:
+            kernel = kernel[replicas]
+        probability = ignition_field(currently_burning, kernel)
+        ignited = (window == TREE) & (probability > 0)
+        ignited[ignited] = self._rng.random(np.count_nonzero(ignited)) <= probability[ignited]
+        window[currently_burning] = BURNED
+        window[ignited] = BURNING
+        self.state[replicas, x_start:x_stop, y_start:y_stop] = window
+        self.burn_times[replicas] += 1
+        still_active = ignited.any(axis=(1, 2))
+        if self._stop_at_top and y_stop == self.edge_length:
+            still_active &= ~ignited[:, :, -1].any(axis=1)
+        self.active[replicas] = still_active
+        self._window = bounding_window(ignited[still_active].any(axis=0), x_start, y_start)
+        if self.wind_trajectory is None:
+            self.wind_state.process()
+        self._step += 1
+
+    def burn(self, mode: str = 'full'):
+        """Same modes as ForestFireModel.burn, percolation mode masks out every replica as soon as it reaches the
+        top row."""
+        ffm.check_burn_mode(mode)
+        self._stop_at_top = mode == 'percolation'
+        if self._stop_at_top:
+            self.active &= ~self.is_top_hit
+        while self._window is not None and self.active.any():
+            self.spread()
+
+    @property
+    def is_top_hit(self) -> np.ndarray:
+        return (self.state[:, :, -1] >= BURNING).any(axis=1)
+
+    def find_biggest_clusters(self, in_state: str = 'burned', connectivity: int = 4) -> np.ndarray:
+        occupied = self.state == STATE_CODES[in_state]
+        return np.array([clusters.label_clusters(replica, connectivity).biggest for replica in occupied])
+
+    def restore(self):
+        self.state[self.state != EMPTY] = TREE
+        self.active[:] = False
+        self.burn_times[:] = 0
+        self._step = 0
+        self._window = None
+        self._stop_at_top = False
+
+    def run(self, in_state: str = 'burned', mode: str = 'full') -> ReplicasResult:
+        """Plant and burn all replicas. Clusters are only labeled in full mode, otherwise biggest_cluster is None."""
+        self.create_cells()
+        self.plant_trees()
+        self.start_fire()
+        self.burn(mode)
+        return ReplicasResult(
+            is_top_hit=self.is_top_hit,
+            burn_time=self.burn_times.copy(),
+            biggest_cluster=self.find_biggest_clusters(in_state) if mode == 'full' else None
+        )
+
+
+if __name__ == '__main__':
+    import time
+
+    for size in (100, 500, 2000):
+        snap = time.time()
+        fire = LatticeForestFireModel(size, 0.6)
+        fire.create_cells()
+        fire.plant_trees()
+        fire.start_fire()
+        fire.burn()
+        print(size, fire.is_top_hit, fire.burn_time, time.time() - snap)
+
+    snap = time.time()
+    result = BatchedForestFireModel(100, 100, 0.6).run()
+    print(result.is_top_hit.mean(), result.burn_time.mean(), result.biggest_cluster.mean(), time.time() - snap)
@@ -0,0 +1,133 @@
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import AgentBasedModeling.common.log.logger_dec as ld
+import AgentBasedModeling.common.log.logger as logger
+
+LOGGER = logger.get_logger(__name__)
+
+_TOUCHES_BOTTOM = 1
+_TOUCHES_TOP = 2
+_SPANS = _TOUCHES_BOTTOM | _TOUCHES_TOP
+
+_NEIGHBOURS_SHIFTS = {
+    4: ((1, 0), (-1, 0), (0, 1), (0, -1)),
+    8: ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+}
+
+
+class PercolationSweep(NamedTuple):
+    """Canonical ensemble estimates for every requested plant probability."""
+
+    probabilities: np.ndarray
+    spanning_probability: np.ndarray
+    largest_cluster: np.ndarray
+
+
+def binomial_weights(sites_count: int, p: float) -> np.ndarray:
+    """Probabilities of having exactly n = 0..sites_count occupied sites when each is occupied with probability p."""
+    weights = np.zeros(sites_count + 1)
+    if p <= 0:
+        weights[0] = 1
+        return weights
+    if p >= 1:
+        weights[-1] = 1
+        return weights
+    n = np.arange(sites_count)
+    log_ratios = np.log((sites_count - n) / (n + 1)) + np.log(p / (1 - p))
+    log_weights = np.concatenate(([0.], np.cumsum(log_ratios)))
+    weights = np.exp(log_weights - log_weights.max())
+    return weights / weights.sum()
+
+
+def _sweep(lattice_size: int, order: List[int], shifts: Tuple[Tuple[int, int], ...]) -> Tuple[List[int], int]:
+    """Occupy sites in given order, keeping clusters in union-find with path compression.
+
+    Site index is x * lattice_size + y. Roots keep negative cluster size, empty sites are marked with None.
+    :return: largest cluster size after each occupation and number of occupied sites at which y = 0 and
+        y = lattice_size - 1 got connected for the first time (sites count + 1 if never).
+    """
+    sites_count = lattice_size * lattice_size
+    parent: List[Optional[int]] = [None] * sites_count
+    touches = [0] * sites_count
+    largest = [0] * (sites_count + 1)
+    spanning_at = sites_count + 1
+    biggest = 0
+
+    def find(site: int) -> int:
+        root = site
+        while parent[root] >= 0:
+            root = parent[root]
+        while parent[site] >= 0:
+            parent[site], site = root, parent[site]
+        return root
+
+    for occupied_count, site in enumerate(order, start=1):
+        x, y = divmod(site, lattice_size)
+        parent[site] = -1
+        root = site
+        touches[site] = (_TOUCHES_BOTTOM if y == 0 else 0) | (_TOUCHES_TOP if y == lattice_size - 1 else 0)
+        for x_off, y_off in shifts:
+            n_x, n_y = x + x_off, y + y_off
+            if not (0 <= n_x < lattice_size and 0 <= n_y < lattice_size):
+                continue
+            neighbour = n_x * lattice_size + n_y
+            if parent[neighbour] is None:
+                continue
+            neighbour_root = find(neighbour)
+            if neighbour_root == root:
+                continue
+            if parent[neighbour_root] < parent[root]:
+                root, neighbour_root = neighbour_root, root
+            parent[root] += parent[neighbour_root]
+            parent[neighbour_root] = root
+            touches[root] |= touches[neighbour_root]
+        biggest = max(biggest, -parent[root])
+        largest[occupied_count] = biggest
+        if touches[root] == _SPANS and spanning_at > sites_count:
+            spanning_at = occupied_count
+    return largest, spanning_at
+
+
+@ld.debug_timer_dec(logger=LOGGER)
+def sweep(
+        lattice_size: int, probabilities: Iterable[float], repetitions: int = 100,
+        connectivity: int = 8, seed: Optional[int] = None
+) -> PercolationSweep:
+    """Newman-Ziff estimate of spanning probability and largest cluster size for all probabilities at once.
+
+    Every repetition occupies the whole lattice one site at a time in random order, which gives microcanonical
+    values for each number of occupied sites. Those are convolved with binomial distribution to get the values
+    for given plant probabilities. Without wind, fire spreads to all 8 neighbours of a burning tree, so with the
+    default connectivity spanning probability equals chance of fire reaching the top of the forest. Largest
+    cluster counts all trees, not only the burned ones.
+
+    :param lattice_size: grid side length.
+    :param probabilities: plant probabilities to estimate values for.
+    :param repetitions: number of independent sweeps.
+    :param connectivity: 8 to match fire spread, 4 for von Neumann neighbourhood.
+    :param seed: seed of occupation orders.
+    """
+    if connectivity not in _NEIGHBOURS_SHIFTS:
+        raise ValueError('Connectivity must be either 4 or 8, got {c}.'.format(c=connectivity))
+    sites_count = lattice_size * lattice_size
+    rng = np.random.default_rng(seed)
+    mean_largest = np.zeros(sites_count + 1)
+    mean_spanning = np.zeros(sites_count + 1)
+    for _ in range(repetitions):
+        largest, spanning_at = _sweep(
+            lattice_size, rng.permutation(sites_count).tolist(), _NEIGHBOURS_SHIFTS[connectivity]
+        )
+        mean_largest += largest
+        mean_spanning[spanning_at:] += 1
+    mean_largest /= repetitions
+    mean_spanning /= repetitions
+
+    probabilities = np.array(list(probabilities), dtype=float)
+    weights = np.array([binomial_weights(sites_count, p) for p in probabilities]).reshape(-1, sites_count + 1)
+    return PercolationSweep(
+        probabilities=probabilities,
+        spanning_probability=weights @ mean_spanning,
+        largest_cluster=weights @ mean_largest
+    )
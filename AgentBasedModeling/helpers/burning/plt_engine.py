@@ -1,11 +1,33 @@
-from typing import Tuple, Iterable, Union
+import copy
+from typing import Tuple, Iterable, Union, Optional, Set, NamedTuple
 
 import AgentBasedModeling.common.shared_cls.square_lat_plt as slp
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
 from AgentBasedModeling.helpers.burning import wind
 from AgentBasedModeling.helpers.burning import cell
 
 
-class PlottingEngine(slp.SquareLatticePlotter):
+class FireSnapshot(NamedTuple):
+    """Everything drawn in a single frame of fire spread, detached from the model state."""
+
+    burning: Set[Tuple[int, int]]
+    burned: Set[Tuple[int, int]]
+    ignition_centers: Set[Tuple[float, float]]
+    wind_state: wind.Wind
+
+    @classmethod
+    def of(
+            cls, burning: Iterable[Union[Tuple[int, int], 'cell.Cell']],
+            burned: Iterable[Union[Tuple[int, int], 'cell.Cell']],
+            ignition_centers: Iterable[Tuple[float, float]], wind_state: wind.Wind
+    ) -> 'FireSnapshot':
+        return cls(
+            PlottingEngine.translate_iterable(burning), PlottingEngine.translate_iterable(burned),
+            set(ignition_centers), copy.copy(wind_state)
+        )
+
+
+class PlottingEngine(slp.SquareLatticePlotter, sr.RecordedReplay):
 
     def __init__(self, grid_length: int, fig_size: Tuple[float, float], out_directory: 'str'):
         super().__init__(grid_length, fig_size, out_directory)
@@ -19,6 +41,22 @@ class PlottingEngine(slp.SquareLatticePlotter):
         self._prepare_wind_base()
         self._create_legend()
 
+    @classmethod
+    def from_recording(cls, recording: sr.StateRecording, out_directory: str) -> 'PlottingEngine':
+        engine = cls(recording.metadata['lattice_size'], (11.5, 8), out_directory)
+        engine.prepare(recording.metadata['plant_probability'])
+        for frame in recording.frames(0, 1, ['state']):
+            engine.draw_forest(slp.mask_positions(frame['state'] != cell.EMPTY))
+        return engine
+
+    def draw_recorded(self, frame: sr.Frame):
+        burning = slp.mask_positions(frame['state'] == cell.BURNING)
+        dx, dy = frame['wind_center'].tolist()
+        self.draw_snapshot(FireSnapshot(
+            burning, slp.mask_positions(frame['state'] == cell.BURNED),
+            {(x + dx, y + dy) for x, y in burning} if frame['spreading'] else set(), wind.Wind(*frame['wind'].tolist())
+        ))
+
     def _prepare_wind_base(self):
         self.wind_axes.set_xticks([])
         self.wind_axes.set_yticks([])
@@ -51,6 +89,18 @@ class PlottingEngine(slp.SquareLatticePlotter):
     def draw_trees(self, trees_coords: Iterable[Union[Tuple[int, int], 'cell.Cell']]):
         self.colour_rectangles(PlottingEngine.translate_iterable(trees_coords), 'green')
 
+    def draw_forest(self, trees_coords: Iterable[Union[Tuple[int, int], 'cell.Cell']]):
+        self.initialize_trees_places(trees_coords)
+        self.draw_trees(trees_coords)
+
+    def draw_snapshot(self, snapshot: FireSnapshot):
+        self.clear_main_axes()
+        self.draw_burning(snapshot.burning)
+        self.draw_burned(snapshot.burned)
+        self.draw_fire_propagation_range(snapshot.ignition_centers)
+        self.draw_wind_arrow(snapshot.wind_state)
+        self.save()
+
     def draw_burning(self, burning_coords: Iterable[Union[Tuple[int, int], 'cell.Cell']]):
         self.colour_rectangles(PlottingEngine.translate_iterable(burning_coords), 'red')
 
@@ -60,13 +110,15 @@ class PlottingEngine(slp.SquareLatticePlotter):
     def draw_fire_propagation_range(self, ignition_centers: Iterable[Union[Tuple[int, int], 'cell.Cell']]):
         self.add_temporary_rectangles(PlottingEngine.translate_iterable(ignition_centers), (3, 3), 'red', 0.2)
 
-    def draw_wind_arrow(self):
-        dx, dy = wind.Wind().get_wind_propagation_center()
-        w_power = wind.Wind().power
+    def draw_wind_arrow(self, current_wind: Optional[wind.Wind] = None):
+        if current_wind is None:
+            current_wind = wind.SharedWind()
+        dx, dy = current_wind.get_wind_propagation_center()
+        w_power = current_wind.power
         [p.remove() for p in self.wind_axes.patches if isinstance(p, slp.patches.FancyArrow)]
-        self.wind_axes.add_patch(slp.patches.FancyArrow(
+        self.add_overlay_patch(self.wind_axes, slp.patches.FancyArrow(
             0, 0, dx, dy,
-            edgecolor='black', facecolor=(1, 0, 0), alpha=wind.Wind().power,
+            edgecolor='black', facecolor=(1, 0, 0), alpha=w_power,
             overhang=0.1 * w_power, width=0.08 + 0.12 * w_power, length_includes_head=True,
             head_width=0.2 + 0.3 * w_power, head_length=0.25 + 0.35 * w_power
         ))
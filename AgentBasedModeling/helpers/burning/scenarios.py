@@ -0,0 +1,146 @@
+import copy
+import inspect
+from typing import Any, Callable, Optional, Sequence, Union
+
+import numpy as np
+
+import AgentBasedModeling.helpers.burning.forest_fire_model as ffm
+import AgentBasedModeling.helpers.burning.lattice_fire_model as lfm
+import AgentBasedModeling.helpers.burning.wind as wind
+import AgentBasedModeling.helpers.burning.clusters as clusters
+import AgentBasedModeling.common.parallel.sweep_runner as sr
+
+
+class SharedForestScenarios:
+    """One planted forest burned under several winds at once.
+
+    Tree mask is shared read-only by all scenarios, each of them keeps only its own burning and burned masks of shape
+    (scenarios, L, L). Scenarios are stepped together with per scenario ignition kernels, and every step draws one
+    random number per site shared by all scenarios, so differences between them come from the wind only (common
+    random numbers).
+    """
+
+    trees: np.ndarray
+    winds: Sequence[wind.Wind]
+    burning: np.ndarray
+    burned: np.ndarray
+
+    def __init__(
+            self, trees: np.ndarray, winds: Sequence[wind.Wind],
+            seed: Optional[Union[int, np.random.SeedSequence, np.random.Generator]] = None
+    ):
+        self.trees = np.array(trees, dtype=bool)
+        self.trees.flags.writeable = False
+        self.winds = list(winds)
+        self.edge_length = self.trees.shape[0]
+        self._rng = np.random.default_rng(seed)
+        self.restore()
+
+    @property
+    def scenarios_count(self) -> int:
+        return len(self.winds)
+
+    def restore(self):
+        shape = (self.scenarios_count, *self.trees.shape)
+        self.burning = np.zeros(shape, dtype=bool)
+        self.burned = np.zeros(shape, dtype=bool)
+        self.active = np.zeros(self.scenarios_count, dtype=bool)
+        self.burn_times = np.zeros(self.scenarios_count, dtype=int)
+        self._window = None
+
+    def start_fire(self):
+        self.burning[:, :, 0] = self.trees[:, 0]
+        self.active[:] = self.trees[:, 0].any()
+        self._window = lfm.bounding_window(self.trees[:, :1], 0, 0)
+
+    def _step(self, winds: Sequence[wind.Wind], stop_at_top: bool):
+        centers = np.array([w.get_wind_propagation_center() for w in winds])
+        x_start, x_stop, y_start, y_stop = self._window
+        x_start, y_start = max(x_start - lfm.KERNEL_REACH, 0), max(y_start - lfm.KERNEL_REACH, 0)
+        x_stop = min(x_stop + lfm.KERNEL_REACH, self.edge_length)
+        y_stop = min(y_stop + lfm.KERNEL_REACH, self.edge_length)
+        scenarios = np.flatnonzero(self.active)
+        burning = self.burning[scenarios, x_start:x_stop, y_start:y_stop]
+        burned = self.burned[scenarios, x_start:x_stop, y_start:y_stop] | burning
+        kernel = lfm.ignition_kernel(centers[scenarios, 0], centers[scenarios, 1])
+        probability = lfm.ignition_field(burning, kernel)
+        draws = self._rng.random(burning.shape[1:])
+        ignited = self.trees[x_start:x_stop, y_start:y_stop] & ~burned & (probability > 0) & (draws <= probability)
+        self.burned[scenarios, x_start:x_stop, y_start:y_stop] = burned
+        self.burning[scenarios, x_start:x_stop, y_start:y_stop] = ignited
+        self.burn_times[scenarios] += 1
+        still_active = ignited.any(axis=(1, 2))
+        if stop_at_top and y_stop == self.edge_length:
+            still_active &= ~ignited[:, :, -1].any(axis=1)
+        self.active[scenarios] = still_active
+        self._window = lfm.bounding_window(ignited[still_active].any(axis=0), x_start, y_start)
+        for w in winds:
+            w.process()
+
+    def burn(self, mode: str = 'full'):
+        """Burn all scenarios, modes as in ForestFireModel.burn. Winds are copied, so given ones are not advanced."""
+        ffm.check_burn_mode(mode)
+        winds = [copy.deepcopy(w) for w in self.winds]
+        stop_at_top = mode == 'percolation'
+        if stop_at_top:
+            self.active &= ~self.is_top_hit
+        while self._window is not None and self.active.any():
+            self._step(winds, stop_at_top)
+
+    @property
+    def is_top_hit(self) -> np.ndarray:
+        return (self.burning[:, :, -1] | self.burned[:, :, -1]).any(axis=1)
+
+    def state_array(self, scenario: int, in_state: str = 'burned') -> np.ndarray:
+        if in_state == 'burned':
+            return self.burned[scenario]
+        if in_state == 'burning':
+            return self.burning[scenario]
+        if in_state == 'tree':
+            return self.trees & ~self.burned[scenario] & ~self.burning[scenario]
+        return ~self.trees
+
+    def find_biggest_clusters(self, in_state: str = 'burned', connectivity: int = 4) -> np.ndarray:
+        return np.array([
+            clusters.label_clusters(self.state_array(scenario, in_state), connectivity).biggest
+            for scenario in range(self.scenarios_count)
+        ])
+
+    def run(self, in_state: str = 'burned', mode: str = 'full') -> lfm.ReplicasResult:
+        """Burn every scenario from scratch. Clusters are only labeled in full mode, otherwise biggest_cluster is
+        None."""
+        self.restore()
+        self.start_fire()
+        self.burn(mode)
+        return lfm.ReplicasResult(
+            is_top_hit=self.is_top_hit,
+            burn_time=self.burn_times.copy(),
+            biggest_cluster=self.find_biggest_clusters(in_state) if mode == 'full' else None
+        )
+
+
+def plant_forest(
+        lattice_size: int, plant_probability: float, seed: Optional[Union[int, np.random.Generator]] = None
+) -> np.ndarray:
+    return np.random.default_rng(seed).random((lattice_size, lattice_size)) <= plant_probability
+
+
+def task_wind(wind_state: Optional[wind.Wind], seed: np.random.SeedSequence) -> Optional[wind.Wind]:
+    """Copy of the wind with random changes reseeded from a task seed, so tasks of a sweep do not replay the wind
+    pickled along with them."""
+    if wind_state is None:
+        return None
+    wind_state = copy.deepcopy(wind_state)
+    wind_state.reseed(sr.int_seed(seed))
+    return wind_state
+
+
+def seeded_fire(
+        fire_model: Callable[..., ffm.ForestFireModel], lattice_size: int, plant_probability: float,
+        seed: Optional[Any] = None, wind_state: Optional[wind.Wind] = None
+) -> ffm.ForestFireModel:
+    """Fire of any engine, seeded if the engine takes a seed. ForestFireModel draws from the random module instead,
+    seeded per task by SweepRunner."""
+    if 'seed' in inspect.signature(fire_model).parameters:
+        return fire_model(lattice_size, plant_probability, seed=seed, wind_state=wind_state)
+    return fire_model(lattice_size, plant_probability, wind_state=wind_state)
@@ -0,0 +1,289 @@
+from typing import Optional, Set, Tuple
+
+import numpy as np
+
+import AgentBasedModeling.helpers.burning.forest_fire_model as ffm
+import AgentBasedModeling.helpers.burning.lattice_fire_model as lfm
+import AgentBasedModeling.helpers.burning.wind as wind
+import AgentBasedModeling.helpers.burning.clusters as clusters
+import AgentBasedModeling.helpers.burning.plt_engine as pe
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
+import AgentBasedModeling.common.log.logger_dec as ld
+import AgentBasedModeling.common.log.logger as logger
+
+LOGGER = logger.get_logger(__name__)
+
+KERNEL_SIDE = 2 * lfm.KERNEL_REACH + 1
+# Flat kernel indices of the von Neumann neighbours, used for clusters.
+_VON_NEUMANN_OFFSETS = np.array([
+    (lfm.KERNEL_REACH + dx) * KERNEL_SIDE + lfm.KERNEL_REACH + dy for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+])
+
+
+def _ragged_range(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenation of range(start, start + count) for all pairs."""
+    run_ends = np.cumsum(counts)
+    return np.arange(run_ends[-1] if run_ends.size else 0) - np.repeat(run_ends - counts - starts, counts)
+
+
+class SparseForestFireModel:
+    """Forest fire model storing only the trees, for forests too large and sparse for L x L lattice.
+
+    Trees are kept as sorted keys x * edge_length + y with per tree state codes of lattice_fire_model. Neighbours
+    within kernel reach are found once after planting by binary search of the sorted keys and stored in CSR form:
+    row i of (indptr, indices, offsets) lists trees reachable from tree i together with the flat index of their
+    offset in the ignition kernel. Single step is then a sparse matrix - vector product over burning rows only, so
+    memory and time scale with number of trees rather than lattice area.
+    """
+
+    keys: np.ndarray
+    xs: np.ndarray
+    ys: np.ndarray
+    state: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    offsets: np.ndarray
+    wind_state: wind.Wind
+    wind_trajectory: Optional[np.ndarray]
+    _front: np.ndarray
+    _plotting_engine: Optional[pe.PlottingEngine]
+    _recorder: Optional[sr.StateRecorder]
+
+    def __init__(
+            self, lattice_size: int, tree_plant_probability: float,
+            plotting_engine: Optional[pe.PlottingEngine] = None, seed: Optional[int] = None,
+            wind_state: Optional[wind.Wind] = None, wind_trajectory: Optional[np.ndarray] = None
+    ):
+        self.wind_state = wind.SharedWind() if wind_state is None else wind_state
+        self.wind_trajectory = wind_trajectory
+        self.edge_length = lattice_size
+        self.plant_prob = tree_plant_probability
+        self._rng = np.random.default_rng(seed)
+        self._ignition_centers = set()
+        self.create_cells()
+        self.plotting_engine = plotting_engine
+        self.recorder = None
+
+    @property
+    def plant_prob(self):
+        return self._plant_prob
+
+    @plant_prob.setter
+    def plant_prob(self, set_val: float):
+        self._plant_prob = min(max(set_val, 0), 1)
+
+    @property
+    def plotting_engine(self):
+        return self._plotting_engine
+
+    @plotting_engine.setter
+    def plotting_engine(self, eng: Optional[pe.PlottingEngine]):
+        self._plotting_engine = eng
+        if eng is not None:
+            self._plotting_engine.prepare(self.plant_prob)
+
+    @property
+    def recorder(self) -> Optional[sr.StateRecorder]:
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, rec: Optional[sr.StateRecorder]):
+        self._recorder = rec
+        if rec is not None:
+            rec.describe(pe.PlottingEngine, lattice_size=self.edge_length, plant_probability=self.plant_prob)
+
+    def _positions(self, selected: np.ndarray) -> Set[Tuple[int, int]]:
+        return set(zip(self.xs[selected].tolist(), self.ys[selected].tolist()))
+
+    @property
+    def living(self) -> Set[Tuple[int, int]]:
+        return self._positions(self.state == lfm.TREE)
+
+    @property
+    def burning(self) -> Set[Tuple[int, int]]:
+        return self._positions(self.state == lfm.BURNING)
+
+    @property
+    def burned(self) -> Set[Tuple[int, int]]:
+        return self._positions(self.state == lfm.BURNED)
+
+    @property
+    def non_empty_cells(self) -> Set[Tuple[int, int]]:
+        return self._positions(slice(None))
+
+    @property
+    def trees_count(self) -> int:
+        return len(self.keys)
+
+    def propagate_trees_to_plotting_engine(self):
+        if self.plotting_engine is not None:
+            self.plotting_engine.submit(
+                self.plotting_engine.draw_forest, self.plotting_engine.translate_iterable(self.non_empty_cells)
+            )
+
+    def process_plotting_engine(self):
+        if self.plotting_engine is not None:
+            self.plotting_engine.submit_snapshot(pe.FireSnapshot.of(
+                self.burning, self.burned, self._ignition_centers, self.wind_state
+            ))
+
+    def process_recorder(self, spreading: bool = True):
+        if self.recorder is not None:
+            self.recorder.record(
+                state=self.state_codes(), wind=(self.wind_state.direction, self.wind_state.power),
+                wind_center=lfm.wind_center(self.wind_state, self.wind_trajectory, self._time_counter),
+                spreading=spreading
+            )
+
+    def create_cells(self):
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.xs, self.ys = self.keys.copy(), self.keys.copy()
+        self.state = np.zeros(0, dtype=np.uint8)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(0, dtype=np.uint8)
+        self._front = np.zeros(0, dtype=np.int64)
+        self._time_counter = 0
+        self._top_hit = False
+        self._track_top = True
+
+    def plant_trees(self):
+        """Draw number of trees from binomial distribution and then their distinct sites, without touching empty
+        ones."""
+        sites_count = self.edge_length ** 2
+        trees_count = self._rng.binomial(sites_count, self.plant_prob)
+        self.keys = np.sort(self._rng.choice(sites_count, trees_count, replace=False)).astype(np.int64)
+        self.xs, self.ys = np.divmod(self.keys, self.edge_length)
+        self.state = np.full(trees_count, lfm.TREE, dtype=np.uint8)
+        self._build_neighbours()
+        self.propagate_trees_to_plotting_engine()
+
+    def _build_neighbours(self):
+        """Only half of the offsets is searched, every found pair is stored in both directions."""
+        rows, columns, offsets = [], [], []
+        if self.trees_count:
+            for i, dx in enumerate(range(-lfm.KERNEL_REACH, lfm.KERNEL_REACH + 1)):
+                for j, dy in enumerate(range(-lfm.KERNEL_REACH, lfm.KERNEL_REACH + 1)):
+                    offset = i * KERNEL_SIDE + j
+                    if offset <= KERNEL_SIDE ** 2 // 2:
+                        continue
+                    n_xs, n_ys = self.xs + dx, self.ys + dy
+                    inside = (n_xs < self.edge_length) & (n_ys >= 0) & (n_ys < self.edge_length)
+                    wanted = n_xs * self.edge_length + n_ys
+                    found_at = np.minimum(np.searchsorted(self.keys, wanted), self.trees_count - 1)
+                    found = inside & (self.keys[found_at] == wanted)
+                    sources, found_at = np.flatnonzero(found), found_at[found]
+                    rows += [sources, found_at]
+                    columns += [found_at, sources]
+                    offsets += [
+                        np.full(len(sources), offset, dtype=np.uint8),
+                        np.full(len(sources), KERNEL_SIDE ** 2 - 1 - offset, dtype=np.uint8)
+                    ]
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        order = np.argsort(rows, kind='stable')
+        self.indices = np.concatenate(columns)[order] if columns else np.zeros(0, dtype=np.int64)
+        self.offsets = np.concatenate(offsets)[order] if offsets else np.zeros(0, dtype=np.uint8)
+        self.indptr = np.zeros(self.trees_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=self.trees_count), out=self.indptr[1:])
+
+    def start_fire(self):
+        self._front = np.flatnonzero(self.ys == 0)
+        self.state[self._front] = lfm.BURNING
+        self._top_hit = bool(self._front.size) and self.edge_length == 1
+
+    def spread(self):
+        i_spots_x_offset, i_spots_y_offset = lfm.wind_center(self.wind_state, self.wind_trajectory, self._time_counter)
+        if self.plotting_engine is not None:
+            self._ignition_centers = {
+                (x + i_spots_x_offset, y + i_spots_y_offset)
+                for x, y in zip(self.xs[self._front].tolist(), self.ys[self._front].tolist())
+            }
+        self.process_plotting_engine()
+        self.process_recorder()
+        kernel = lfm.ignition_kernel(i_spots_x_offset, i_spots_y_offset).ravel()
+        starts = self.indptr[self._front]
+        edges = _ragged_range(starts, self.indptr[self._front + 1] - starts)
+        targets, weights = self.indices[edges], kernel[self.offsets[edges]]
+        reachable = (self.state[targets] == lfm.TREE) & (weights > 0)
+        candidates, inverse = np.unique(targets[reachable], return_inverse=True)
+        probability = np.bincount(inverse.reshape(-1), weights=weights[reachable], minlength=len(candidates))
+        ignited = candidates[self._rng.random(len(candidates)) <= probability]
+        self.state[self._front] = lfm.BURNED
+        self.state[ignited] = lfm.BURNING
+        self._front = ignited
+        if self._track_top and (self.ys[ignited] == self.edge_length - 1).any():
+            self._top_hit = True
+        if self.wind_trajectory is None:
+            self.wind_state.process()
+        self._time_counter += 1
+
+    def burn(self, mode: str = 'full'):
+        """Same modes as ForestFireModel.burn."""
+        ffm.check_burn_mode(mode)
+        self._track_top = mode != 'burn_time'
+        while self._front.size:
+            if mode == 'percolation' and self._top_hit:
+                break
+            self.spread()
+        self.process_recorder(spreading=False)
+        if self.plotting_engine is not None:
+            self._ignition_centers = set()
+            self.process_plotting_engine()
+            self.plotting_engine.animate()
+
+    @property
+    def burn_time(self) -> int:
+        return self._time_counter
+
+    @property
+    def is_top_hit(self) -> bool:
+        if self._track_top:
+            return self._top_hit
+        return bool((self.state[self.ys == self.edge_length - 1] >= lfm.BURNING).any())
+
+    def state_codes(self) -> np.ndarray:
+        """Dense L x L lattice of state codes, as kept by LatticeForestFireModel."""
+        codes = np.zeros((self.edge_length, self.edge_length), dtype=np.uint8)
+        codes[self.xs, self.ys] = self.state
+        return codes
+
+    def state_array(self, in_state: str = 'burned') -> np.ndarray:
+        """Dense L x L mask of trees in given state, this costs lattice area memory."""
+        occupied = np.zeros((self.edge_length, self.edge_length), dtype=bool)
+        selected = self.state == lfm.STATE_CODES[in_state]
+        occupied[self.xs[selected], self.ys[selected]] = True
+        return occupied
+
+    def find_clusters(self, in_state: str = 'burned', connectivity: int = 4) -> clusters.ClusterReport:
+        return clusters.label_clusters(self.state_array(in_state), connectivity)
+
+    @ld.debug_timer_dec(logger=LOGGER)
+    def find_biggest_cluster_by_kh(self, in_state: str = 'burned') -> int:
+        """Biggest von Neumann cluster found on the neighbour lists, without building the dense lattice."""
+        occupied = self.state == lfm.STATE_CODES[in_state]
+        rows = np.repeat(np.arange(self.trees_count), np.diff(self.indptr))
+        linked = np.isin(self.offsets, _VON_NEUMANN_OFFSETS) & occupied[rows] & occupied[self.indices]
+        roots = clusters.graph_components(self.trees_count, rows[linked], self.indices[linked])
+        return int(np.bincount(roots[occupied]).max(initial=0))
+
+    find_biggest_cluster_by_me = find_biggest_cluster_by_kh
+
+    def restore(self):
+        self.state[:] = lfm.TREE
+        self._front = np.zeros(0, dtype=np.int64)
+        self._time_counter = 0
+        self._top_hit = False
+        self._track_top = True
+
+
+if __name__ == '__main__':
+    import time
+
+    for size, probability in ((1000, 0.6), (10000, 0.05), (100000, 0.0005)):
+        snap = time.time()
+        fire = SparseForestFireModel(size, probability)
+        fire.plant_trees()
+        planted = time.time() - snap
+        fire.start_fire()
+        fire.burn()
+        print(size, fire.trees_count, fire.is_top_hit, fire.burn_time, planted, time.time() - snap)
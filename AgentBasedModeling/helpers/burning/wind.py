@@ -1,16 +1,19 @@
-from typing import Tuple
+from typing import Tuple, Optional, Iterable
 
 import AgentBasedModeling.common.mclasses.singleton as singleton
+import numpy as np
+import copy
 import random
 import math
 
 
-class Wind(metaclass=singleton.Singleton):
+class Wind:
 
     def __init__(
             self, initial_direction_angle: float = 0,
             initial_power: float = 0,
-            is_randomized: bool = False
+            is_randomized: bool = False,
+            seed: Optional[int] = None
     ):
         self.direction = initial_direction_angle
         self.power = initial_power
@@ -18,6 +21,7 @@ class Wind(metaclass=singleton.Singleton):
 
         self._power_swing = 0.6
         self._angle_swing = 60
+        self._rng = random.Random(seed)
 
     @property
     def power(self) -> float:
@@ -46,6 +50,10 @@ class Wind(metaclass=singleton.Singleton):
         horizontal_shift = self.power * math.cos(2*math.pi*self.direction/360)
         return horizontal_shift, vertical_shift
 
+    def reseed(self, seed: Optional[int]):
+        """Restart random changes of the wind from a new seed."""
+        self._rng = random.Random(seed)
+
     def set_power_swing(self, swing: float):
         self._power_swing = swing
 
@@ -54,6 +62,24 @@ class Wind(metaclass=singleton.Singleton):
 
     def process(self):
         if self.is_state_random:
-            to_add = random.random() * self._power_swing - self._power_swing / 2
-            self.direction += random.random() * self._angle_swing - self._angle_swing / 2
+            to_add = self._rng.random() * self._power_swing - self._power_swing / 2
+            self.direction += self._rng.random() * self._angle_swing - self._angle_swing / 2
             self.power += to_add
+
+    def trajectory(self, steps: int) -> np.ndarray:
+        """Propagation centers of the following steps as (steps, 2) array. Wind itself is not advanced."""
+        future = copy.deepcopy(self)
+        centers = np.empty((steps, 2))
+        for step in range(steps):
+            centers[step] = future.get_wind_propagation_center()
+            future.process()
+        return centers
+
+
+class SharedWind(Wind, metaclass=singleton.Singleton):
+    """Process wide wind, used by models that were not given their own."""
+
+
+def stack_trajectories(winds: Iterable[Wind], steps: int) -> np.ndarray:
+    """Trajectories of several winds as (winds, steps, 2) array."""
+    return np.stack([w.trajectory(steps) for w in winds])
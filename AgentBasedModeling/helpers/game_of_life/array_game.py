@@ -0,0 +1,96 @@
+from typing import Union, Iterable, Tuple, Set, Optional
+
+import numpy as np
+
+from AgentBasedModeling.helpers.game_of_life import game
+from AgentBasedModeling.common.log import logger
+
+LOGGER = logger.get_logger(__name__)
+
+
+class ArrayGameOfLife(game.GameOfLife):
+    """Game of life keeping the board as (width, height) bool array indexed [x, y], with y = 0 at the bottom.
+
+    Neighbour counts are the neighbourhood matrix convolved with the board, summed as one shifted slice per
+    neighbourhood shift over a padded copy of the board. Padding of every side either wraps around the board (portal
+    sides) or stays dead, so the board behaves as linked cells of GameOfLife. Rules are applied as masks over the
+    whole board, so no Cell objects are created at all.
+    """
+
+    game_state: np.ndarray
+    initial_state: np.ndarray
+    _padded: Optional[np.ndarray]
+
+    def _build_board(self, initial_state: Union[np.ndarray, Iterable[Iterable[int]]]):
+        rows = np.asarray(initial_state)
+        if rows.ndim != 2 or rows.shape != (self.height, self.width):
+            LOGGER.error('Incompatible initial state size. Possibly rows have varying length.')
+            raise ValueError('Wrong specification of initial state.')
+        self.game_state = (rows[::-1] == 1).T.copy()
+        self.initial_state = self.game_state.copy()
+        self._padded = None
+
+    @property
+    def reach(self) -> Tuple[int, int]:
+        """Largest x and y offsets of the neighbourhood, i.e. width of padding."""
+        return (
+            max((abs(x_off) for x_off, _ in self.neighbours_shifts), default=0),
+            max((abs(y_off) for _, y_off in self.neighbours_shifts), default=0)
+        )
+
+    @property
+    def living(self) -> Set[Tuple[int, int]]:
+        return set(map(tuple, np.argwhere(self.game_state).tolist()))
+
+    @property
+    def dead(self) -> Set[Tuple[int, int]]:
+        return set(map(tuple, np.argwhere(~self.game_state).tolist()))
+
+    def link_cells(self):
+        """Nothing to link, neighbourhood is applied to the whole board at once."""
+
+    def _pad(self) -> np.ndarray:
+        """Copy board into the middle of padded buffer and fill the margins according to portals."""
+        x_reach, y_reach = self.reach
+        width, height = self.width, self.height
+        shape = (width + 2 * x_reach, height + 2 * y_reach)
+        if self._padded is None or self._padded.shape != shape:
+            self._padded = np.zeros(shape, dtype=np.uint8)
+        padded = self._padded
+        padded[x_reach:x_reach + width, y_reach:y_reach + height] = self.game_state
+        inner_y = slice(y_reach, y_reach + height)
+        padded[:x_reach, inner_y] = self.game_state[width - x_reach:] if 3 in self._portals else 0
+        padded[x_reach + width:, inner_y] = self.game_state[:x_reach] if 4 in self._portals else 0
+        # Bottom and top margins are copied from already padded columns, so corners wrap only if both sides do.
+        padded[:, :y_reach] = padded[:, height:height + y_reach] if 1 in self._portals else 0
+        padded[:, y_reach + height:] = padded[:, y_reach:2 * y_reach] if 2 in self._portals else 0
+        return padded
+
+    def neighbour_counts(self) -> np.ndarray:
+        """Number of alive neighbours of every site."""
+        padded = self._pad()
+        x_reach, y_reach = self.reach
+        counts = np.zeros((self.width, self.height), dtype=np.uint8 if len(self.neighbours_shifts) < 256 else int)
+        for x_off, y_off in self.neighbours_shifts:
+            counts += padded[
+                x_reach + x_off:x_reach + x_off + self.width, y_reach + y_off:y_reach + y_off + self.height
+            ]
+        return counts
+
+    def _next_alive(self, alive: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Rules applied to cells of given states and neighbour counts."""
+        survive = (counts >= self.underpopulation_threshold) & (counts <= self.overpopulation_threshold)
+        born = (counts >= self._reproduction_low) & (counts <= self._reproduction_high)
+        return (alive & survive) | (born & ~alive)
+
+    def _create_next_state(self) -> np.ndarray:
+        return self._next_alive(self.game_state, self.neighbour_counts())
+
+    def _board_of(self, state: np.ndarray) -> np.ndarray:
+        return state
+
+    def _state_of(self, board: np.ndarray) -> np.ndarray:
+        return board
+
+    def _apply_state(self, next_state: np.ndarray):
+        self.game_state = next_state
@@ -0,0 +1,38 @@
+import hashlib
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class BoardHistory:
+    """Digests of visited boards mapped to the step they were visited at.
+
+    Bool board is packed to bits (any other board, e.g. already packed words, is taken as it is) and hashed with
+    128-bit blake2b, so a step costs a single pass over the packed board and memory does not depend on board size.
+    Only max_size most recent boards are remembered: a cycle is still found once it repeats within that window, but
+    transient longer than the window is reported longer by whole periods.
+    """
+
+    _seen: Dict[bytes, int]
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._seen = {}
+
+    @staticmethod
+    def digest(board: np.ndarray) -> bytes:
+        data = np.packbits(board) if board.dtype == bool else np.ascontiguousarray(board)
+        # Shape is hashed as well, so boards of different shapes never share packed bits.
+        digest = hashlib.blake2b(np.array(board.shape, dtype=np.int64).tobytes(), digest_size=16)
+        digest.update(data.tobytes())
+        return digest.digest()
+
+    def visit(self, board: np.ndarray, step: int) -> Optional[int]:
+        """Step at which the board was visited before, if it was, otherwise remember it and return None."""
+        key = self.digest(board)
+        if key in self._seen:
+            return self._seen[key]
+        if len(self._seen) >= self.max_size:
+            del self._seen[next(iter(self._seen))]
+        self._seen[key] = step
+        return None
@@ -2,18 +2,25 @@ from typing import Union, Iterable, Tuple, Dict, Set, Optional, Any
 
 import numpy as np
 
-from AgentBasedModeling.helpers.game_of_life import cell, plt_engine as pe
+from AgentBasedModeling.helpers.game_of_life import (
+    cell, board_history as bh, hashlife as hl, pattern_io as pio, plt_engine as pe
+)
 from AgentBasedModeling.common.log import logger
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
+import AgentBasedModeling.common.shared_cls.neighbour_table as nt
 import os
 
 LOGGER = logger.get_logger(__name__)
 
+MOORE_SHIFTS = frozenset((x_off, y_off) for x_off in (-1, 0, 1) for y_off in (-1, 0, 1) if x_off or y_off)
+
 
 class GameOfLife:
 
     borders_names = ['bottom', 'top', 'left', 'right']
     borders_numbers = [1, 2, 3, 4]
     borders_name_number_mapping = {name: number for name, number in zip(borders_names, borders_numbers)}
+    history_size: int = 4096
 
     height: int
     width: int
@@ -24,6 +31,9 @@ class GameOfLife:
     _reproduction_low: int
     _reproduction_high: int
     plotting_engine: Optional[pe.PlottingEngine]
+    transient_length: Optional[int]
+    period: Optional[int]
+    _recorder: Optional[sr.StateRecorder]
     _portals: Set[int]
 
     def __init__(
@@ -39,19 +49,7 @@ class GameOfLife:
         except AttributeError:
             self.size = (len(initial_state), len(initial_state[0]))
 
-        self.game_state = {}
-        self.cells = set()
-        for x in range(self.width):
-            for y in range(self.height):
-                try:
-                    c = cell.Cell(x, y, 'alive' if initial_state[self.height - 1 - y][x] == 1 else 'dead')
-                    self.cells.add(c)
-                    self.game_state[c] = c.state
-                except IndexError as e:
-                    LOGGER.error('Incompatible initial state size. Possibly rows have varying length.')
-                    raise e
-
-        self.initial_state = self.game_state.copy()
+        self._build_board(initial_state)
 
         self.teleports = teleport_borders
 
@@ -66,9 +64,28 @@ class GameOfLife:
             self.plotting_engine.prepare(self.neighbours_shifts, self._portals)
         else:
             self.plotting_engine = None
+        self.recorder = None
 
         self.tends_to_stable = False
         self.is_oscillator = False
+        self.transient_length = None
+        self.period = None
+
+    def _build_board(self, initial_state: Union[np.ndarray, Iterable[Iterable[int]]]):
+        """Create cells from rows of initial state, first row is the top of the board."""
+        self.game_state = {}
+        self.cells = set()
+        for x in range(self.width):
+            for y in range(self.height):
+                try:
+                    c = cell.Cell(x, y, 'alive' if initial_state[self.height - 1 - y][x] == 1 else 'dead')
+                    self.cells.add(c)
+                    self.game_state[c] = c.state
+                except IndexError as e:
+                    LOGGER.error('Incompatible initial state size. Possibly rows have varying length.')
+                    raise e
+
+        self.initial_state = self.game_state.copy()
 
     @property
     def size(self) -> Tuple[int, int]:
@@ -105,6 +122,27 @@ class GameOfLife:
         else:
             self._reproduction_low, self._reproduction_high = set_val
 
+    @property
+    def is_standard_rule(self) -> bool:
+        """B3/S23 on Moore neighbourhood, the rule HashLife computes."""
+        return (
+            (self.underpopulation_threshold, self.overpopulation_threshold) == (2, 3) and
+            self.reproduction_range == (3, 3) and self.neighbours_shifts == MOORE_SHIFTS
+        )
+
+    @property
+    def recorder(self) -> Optional[sr.StateRecorder]:
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, rec: Optional[sr.StateRecorder]):
+        self._recorder = rec
+        if rec is not None:
+            rec.describe(
+                pe.PlottingEngine, size=list(self.size), neighbours_shifts=sorted(self.neighbours_shifts),
+                portals=sorted(self._portals)
+            )
+
     @property
     def living(self):
         return {c for c in self.cells if c.state == 'alive'}
@@ -140,53 +178,115 @@ class GameOfLife:
         }
 
     def link_cells(self):
+        """Link cells through neighbour table shared by all games of the same board size, neighbourhood and portals."""
+        table = nt.neighbour_table(
+            self.width, self.height, tuple(sorted(self.neighbours_shifts)),
+            wrap_left=3 in self._portals, wrap_right=4 in self._portals,
+            wrap_bottom=1 in self._portals, wrap_top=2 in self._portals
+        )
+        by_site = [None] * (self.width * self.height)
         for c in self.cells:
-            self._link_cell(c)
-
-    def _link_cell(self, c: cell.Cell):
-        cell_x, cell_y = c.position
-        possible_neighbours_positions = {
-            (cell_x + x_offset, cell_y + y_offset) for x_offset, y_offset in self.neighbours_shifts
-        }
-        linked_positions = {
-            (x % self.width, y % self.height)
-            for x, y in possible_neighbours_positions
-            if self.__is_viable(x, y)
-        }
-        c.add_neighbours({n_cell for n_cell in self.cells if n_cell.position in linked_positions})
-
-    def __is_viable(self, x: int, y: int):
-        if x < 0 and 3 not in self._portals:
-            return False
-        if x > self.width - 1 and 4 not in self._portals:
-            return False
-        if y < 0 and 1 not in self._portals:
-            return False
-        if y > self.height - 1 and 2 not in self._portals:
-            return False
-        return True
+            by_site[table.site(c.x, c.y)] = c
+        for c, neighbours in zip(by_site, table.rows()):
+            c.add_neighbours([by_site[site] for site in neighbours])
 
     def process(self, max_iterations: int = 1000):
+        """Step the game until some board repeats or max_iterations pass.
+
+        On repetition transient_length is the step at which the repeated board was first seen and period the number of
+        steps between its visits, tends_to_stable marks period 1 and is_oscillator longer periods. Both stay None if
+        no board repeats within max_iterations (or within history_size most recent boards).
+        """
+        self.tends_to_stable, self.is_oscillator = False, False
+        self.transient_length, self.period = None, None
+        history = bh.BoardHistory(self.history_size)
+        history.visit(self._board_of(self.game_state), 0)
         for it in range(max_iterations):
             self._process_plotting_machine()
+            self._process_recorder()
             next_state = self._create_next_state()
-            if next_state == self.game_state:
-                self.tends_to_stable = True
-                if next_state != self.initial_state:
+            visited_at = history.visit(self._board_of(next_state), it + 1)
+            if visited_at is not None:
+                self.transient_length, self.period = visited_at, it + 1 - visited_at
+                self.tends_to_stable = self.period == 1
+                self.is_oscillator = self.period > 1
+                if self.tends_to_stable and self.transient_length > 0 and self.plotting_engine is not None:
                     self.plotting_engine.loop_n_last_pictures(1, min(20, max_iterations - it))
                 break
-            if next_state == self.initial_state:
-                self.is_oscillator = True
+            self._apply_state(next_state)
+
+    def step(self):
+        """Single generation, without plotting or recording."""
+        self._apply_state(self._create_next_state())
+
+    def advance(self, generations: int):
+        """Jump generations ahead, without plotting or recording.
+
+        Standard rule on a board without portals is handed to HashLife, taking the board as a window onto the
+        unbounded plane. Nothing travels faster than a cell per generation, so a jump of 2^k generations is taken only
+        while living cells keep at least 2^k + 1 cells from every side, and no cell can have left the board (where
+        bounded board has no cells) on its way. Once even a single generation is not safe, the rest is stepped
+        generation by generation instead, as is any other game, skipping whole periods once a board repeats.
+        """
+        if self.is_standard_rule and not self._portals:
+            life = hl.HashLife.from_board(self.alive_array())
+            while generations:
+                living = np.array(list(life.living), dtype=np.int64).reshape(-1, 2)
+                if not len(living):
+                    generations = 0
+                    break
+                low, high = living.min(axis=0), living.max(axis=0)
+                margin = int(min(low[0], low[1], self.width - 1 - high[0], self.height - 1 - high[1]))
+                if margin < 2:
+                    break
+                k = min(generations.bit_length(), (margin - 1).bit_length()) - 1
+                life.step(k)
+                generations -= 2 ** k
+            self._replace_state(self._state_of(life.to_board(self.width, self.height)))
+        history = bh.BoardHistory(self.history_size)
+        history.visit(self._board_of(self.game_state), 0)
+        for it in range(generations):
+            next_state = self._create_next_state()
+            visited_at = history.visit(self._board_of(next_state), it + 1)
+            self._apply_state(next_state)
+            if visited_at is not None:
+                for _ in range((generations - it - 1) % (it + 1 - visited_at)):
+                    self.step()
                 break
-            for c, s in next_state.items():
-                c.state = s
-            self.game_state = next_state
+
+    def _board_of(self, state: Dict[cell.Cell, str]) -> np.ndarray:
+        """Game state as (width, height) bool array indexed [x, y]."""
+        board = np.zeros((self.width, self.height), dtype=bool)
+        for c, s in state.items():
+            if s == 'alive':
+                board[c.position] = True
+        return board
+
+    def alive_array(self) -> np.ndarray:
+        return self._board_of(self.game_state)
+
+    def _state_of(self, board: np.ndarray) -> Dict[cell.Cell, str]:
+        """Inverse of alive_array."""
+        return {c: 'alive' if board[c.position] else 'dead' for c in self.cells}
+
+    def _apply_state(self, next_state: Dict[cell.Cell, str]):
+        for c, s in next_state.items():
+            c.state = s
+        self.game_state = next_state
+
+    def _replace_state(self, state: Dict[cell.Cell, str]):
+        """Set state that need not follow from the current one, e.g. one jumped to by advance."""
+        self._apply_state(state)
 
     def _process_plotting_machine(self):
         if self.plotting_engine is not None:
-            self.plotting_engine.draw_alive(self.living)
-            self.plotting_engine.draw_dead(self.dead)
-            self.plotting_engine.save()
+            self.plotting_engine.submit_snapshot(pe.LifeSnapshot(
+                pe.PlottingEngine.translate_iterable(self.living), pe.PlottingEngine.translate_iterable(self.dead)
+            ))
+
+    def _process_recorder(self):
+        if self.recorder is not None:
+            self.recorder.record(alive=self.alive_array())
 
     def _create_next_state(self) -> Dict[cell.Cell, str]:
         next_states = {}
@@ -202,37 +302,46 @@ class GameOfLife:
         return next_states
 
     @staticmethod
+    def _read_grid(path: str, delimiter: str = ',', truth_marker: Any = '1') -> np.ndarray:
+        """Rows of CSV file as int array, 1 where the marker is."""
+        with open(path, 'r') as f_handler:
+            levels = [line.split(delimiter) for line in f_handler]
+        return (np.array(levels) == str(truth_marker)).astype(int)
+
+    @classmethod
     def from_csv(
-            grid_path: str,
+            cls, grid_path: str,
             delimiter: str = ',', truth_marker: Any = '1',
             neighbourhood_path: Optional[str] = None,
             plot: bool = True, borders: Iterable[Union[str, int]] = ()
     ) -> 'GameOfLife':
-        with open(grid_path, 'r') as f_handler:
-            this_dir = os.path.join(os.path.dirname(f_handler.name), 'Images')
-            levels = []
-            for line in f_handler:
-                levels.append(line.split(delimiter))
-        initial_state = np.array(levels)
-        _selector = initial_state == str(truth_marker)
-        initial_state[_selector] = 1
-        initial_state[~_selector] = 0
+        this_dir = os.path.join(os.path.dirname(grid_path), 'Images')
+        initial_state = cls._read_grid(grid_path, delimiter, truth_marker)
         if neighbourhood_path:
-            with open(neighbourhood_path, 'r') as f_handler:
-                levels = []
-                for line in f_handler:
-                    levels.append(line.split(delimiter))
-            neighbourhood = np.array(levels)
-            _selector = neighbourhood == str(truth_marker)
-            neighbourhood[_selector] = 1
-            neighbourhood[~_selector] = 0
+            neighbourhood = cls._read_grid(neighbourhood_path, delimiter, truth_marker)
         else:
             neighbourhood = np.array([[1, 1, 1], [1, 0, 1], [1, 1, 1]])
 
-        initial_state = initial_state.astype(int)
-        neighbourhood = neighbourhood.astype(int)
+        return cls(initial_state, neighbourhood, borders, plot=plot, out_directory=this_dir)
 
-        return GameOfLife(initial_state, neighbourhood, borders, plot=plot, out_directory=this_dir)
+    @classmethod
+    def from_file(
+            cls, path: str,
+            delimiter: str = ',', truth_marker: Any = '1',
+            neighbourhood_path: Optional[str] = None,
+            plot: bool = True, borders: Iterable[Union[str, int]] = ()
+    ) -> 'GameOfLife':
+        """Game of RLE, plaintext (.cells) or raw bitmap pattern (see pattern_io), of CSV file for any other extension.
+        Rule named by RLE header sets the thresholds, neighbourhood is read as in from_csv."""
+        if os.path.splitext(path)[1].lower() not in pio.PATTERN_EXTENSIONS:
+            return cls.from_csv(path, delimiter, truth_marker, neighbourhood_path, plot, borders)
+        initial_state, rule = pio.read_pattern(path)
+        neighbourhood = cls._read_grid(neighbourhood_path, delimiter, truth_marker) if neighbourhood_path else None
+        this_dir = os.path.join(os.path.dirname(path), 'Images')
+        return cls(
+            initial_state, neighbourhood, borders, plot=plot, out_directory=this_dir,
+            **(pio.parse_rule(rule) if rule else {})
+        )
 
 
 if __name__ == '__main__':
@@ -0,0 +1,235 @@
+import collections
+import weakref
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from AgentBasedModeling.common.log import logger
+
+LOGGER = logger.get_logger(__name__)
+
+
+class Node:
+    """Square of 2^level x 2^level cells of the unbounded plane, made of four quadrants one level lower.
+
+    Nodes are canonical (see HashLife.join), so equal squares are the same object, compared and hashed by identity.
+    Level 0 nodes are single cells, DEAD and ALIVE. Quadrants are named with y growing upwards, as on the board.
+    """
+
+    __slots__ = ('level', 'nw', 'ne', 'sw', 'se', 'population', 'next', '__weakref__')
+
+    level: int
+    population: int
+    next: Optional[Dict[int, 'Node']]
+
+    def __init__(
+            self, level: int, nw: Optional['Node'] = None, ne: Optional['Node'] = None,
+            sw: Optional['Node'] = None, se: Optional['Node'] = None, population: int = 0
+    ):
+        self.level = level
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.population = population if nw is None else nw.population + ne.population + sw.population + se.population
+        # Memoized successors, centre of the node 2^j generations later keyed by j.
+        self.next = None
+
+
+DEAD = Node(0, population=0)
+ALIVE = Node(0, population=1)
+
+Cells = Set[Tuple[int, int]]
+
+
+class HashLife:
+    """Standard (B3/S23) game of life on the unbounded plane, advanced by memoized quadtree nodes.
+
+    Every node is created through join, which returns the existing node of the same quadrants if there is one, so
+    repeating parts of a pattern (in space or in time) are stored and advanced only once. The canonical table holds
+    nodes weakly, nodes stay alive while referenced by the current pattern or by cache_size most recently joined
+    nodes, so memory is bounded however long the run is.
+
+    Universe is the root node with its lower left corner at origin.
+    """
+
+    _table: 'weakref.WeakValueDictionary[Tuple[Node, Node, Node, Node], Node]'
+    _recent: Deque[Node]
+    _empty: List[Node]
+    root: Node
+    origin: Tuple[int, int]
+    generation: int
+
+    def __init__(self, cells: Iterable[Tuple[int, int]] = (), cache_size: int = 1 << 20):
+        self._table = weakref.WeakValueDictionary()
+        self._recent = collections.deque(maxlen=cache_size)
+        self._empty = [DEAD]
+        self.generation = 0
+        cells = np.array(list(cells), dtype=np.int64).reshape(-1, 2)
+        if len(cells):
+            low = cells.min(axis=0)
+            board = np.zeros(cells.max(axis=0) - low + 1, dtype=bool)
+            board[tuple((cells - low).T)] = True
+        else:
+            low, board = (0, 0), np.zeros((1, 1), dtype=bool)
+        self._set_board(board, (int(low[0]), int(low[1])))
+
+    @classmethod
+    def from_board(cls, board: np.ndarray, cache_size: int = 1 << 20) -> 'HashLife':
+        """Universe of (width, height) bool board indexed [x, y], its cell [0, 0] placed at (0, 0)."""
+        life = cls(cache_size=cache_size)
+        life._set_board(np.asarray(board, dtype=bool), (0, 0))
+        return life
+
+    def _set_board(self, board: np.ndarray, origin: Tuple[int, int]):
+        level = max(int(max(board.shape) - 1).bit_length(), 1)
+        square = np.zeros((2 ** level, 2 ** level), dtype=bool)
+        square[:board.shape[0], :board.shape[1]] = board
+        self.root, self.origin = self._build(square), origin
+
+    def _build(self, square: np.ndarray) -> Node:
+        size = square.shape[0]
+        if not square.any():
+            return self.empty(size.bit_length() - 1)
+        if size == 1:
+            return ALIVE
+        half = size // 2
+        return self.join(
+            self._build(square[:half, half:]), self._build(square[half:, half:]),
+            self._build(square[:half, :half]), self._build(square[half:, :half])
+        )
+
+    def join(self, nw: Node, ne: Node, sw: Node, se: Node) -> Node:
+        key = (nw, ne, sw, se)
+        node = self._table.get(key)
+        if node is None:
+            node = Node(nw.level + 1, nw, ne, sw, se)
+            self._table[key] = node
+        self._recent.append(node)
+        return node
+
+    def empty(self, level: int) -> Node:
+        while len(self._empty) <= level:
+            below = self._empty[-1]
+            self._empty.append(self.join(below, below, below, below))
+        return self._empty[level]
+
+    @property
+    def population(self) -> int:
+        return self.root.population
+
+    @property
+    def living(self) -> Cells:
+        cells = set()
+        self._collect(self.root, self.origin[0], self.origin[1], cells)
+        return cells
+
+    def _collect(self, node: Node, x: int, y: int, cells: Cells):
+        if node.population == 0:
+            return
+        if node.level == 0:
+            cells.add((x, y))
+            return
+        half = 2 ** (node.level - 1)
+        self._collect(node.nw, x, y + half, cells)
+        self._collect(node.ne, x + half, y + half, cells)
+        self._collect(node.sw, x, y, cells)
+        self._collect(node.se, x + half, y, cells)
+
+    def to_board(self, width: int, height: int) -> np.ndarray:
+        """Cells of [0, width) x [0, height) window as bool array indexed [x, y]."""
+        board = np.zeros((width, height), dtype=bool)
+        for x, y in self.living:
+            if 0 <= x < width and 0 <= y < height:
+                board[x, y] = True
+        return board
+
+    def _centre(self, node: Node) -> Node:
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def _expand(self, node: Node) -> Node:
+        """Node one level higher with the given node in its centre."""
+        border = self.empty(node.level - 1)
+        return self.join(
+            self.join(border, border, border, node.nw), self.join(border, border, node.ne, border),
+            self.join(border, node.sw, border, border), self.join(node.se, border, border, border)
+        )
+
+    def _expand_root(self):
+        self.root = self._expand(self.root)
+        shift = 2 ** (self.root.level - 2)
+        self.origin = (self.origin[0] - shift, self.origin[1] - shift)
+
+    @staticmethod
+    def _grandchildren(node: Node) -> List[List[Node]]:
+        """4 x 4 grid of nodes two levels lower, rows from the top."""
+        return [
+            [node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne],
+            [node.nw.sw, node.nw.se, node.ne.sw, node.ne.se],
+            [node.sw.nw, node.sw.ne, node.se.nw, node.se.ne],
+            [node.sw.sw, node.sw.se, node.se.sw, node.se.se]
+        ]
+
+    @staticmethod
+    def _life_4x4(node: Node) -> List[List[Node]]:
+        """Centre 2 x 2 of level 2 node one generation later, as rows of cells from the top."""
+        grid = HashLife._grandchildren(node)
+        rows = []
+        for r in (1, 2):
+            row = []
+            for c in (1, 2):
+                alive = sum(
+                    grid[r + dr][c + dc].population for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc
+                )
+                row.append(ALIVE if alive == 3 or (alive == 2 and grid[r][c] is ALIVE) else DEAD)
+            rows.append(row)
+        return rows
+
+    def successor(self, node: Node, j: int) -> Node:
+        """Centre of node (one level lower) 2^j generations later, j is capped at node level - 2."""
+        j = min(j, node.level - 2)
+        if node.population == 0:
+            return self.empty(node.level - 1)
+        if node.next is not None and j in node.next:
+            return node.next[j]
+        if node.level == 2:
+            (nw, ne), (sw, se) = self._life_4x4(node)
+            result = self.join(nw, ne, sw, se)
+        else:
+            grand = self._grandchildren(node)
+            # Nine overlapping subsquares one level lower, advanced by up to half of the generations.
+            steps = [
+                [
+                    self.successor(self.join(grand[r][c], grand[r][c + 1], grand[r + 1][c], grand[r + 1][c + 1]), j)
+                    for c in range(3)
+                ]
+                for r in range(3)
+            ]
+            quadrants = []
+            for r in (0, 1):
+                for c in (0, 1):
+                    square = self.join(steps[r][c], steps[r][c + 1], steps[r + 1][c], steps[r + 1][c + 1])
+                    # Full speed advances the other half now, otherwise the subsquares are already there.
+                    quadrants.append(self.successor(square, j) if j == node.level - 2 else self._centre(square))
+            result = self.join(*quadrants)
+        if node.next is None:
+            node.next = {}
+        node.next[j] = result
+        return result
+
+    def step(self, k: int):
+        """Advance 2^k generations at once."""
+        # Pattern confined to the centre half of root, with one more level around it, cannot leave the successor.
+        while self.root.level < k + 2 or self._centre(self.root).population != self.root.population:
+            self._expand_root()
+        self._expand_root()
+        shift = 2 ** (self.root.level - 2)
+        self.root = self.successor(self.root, k)
+        self.origin = (self.origin[0] + shift, self.origin[1] + shift)
+        self.generation += 2 ** k
+
+    def advance(self, generations: int):
+        """Advance any number of generations, one step of 2^k per set bit."""
+        k = 0
+        while generations:
+            if generations & 1:
+                self.step(k)
+            generations >>= 1
+            k += 1
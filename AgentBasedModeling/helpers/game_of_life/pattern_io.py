@@ -0,0 +1,174 @@
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from AgentBasedModeling.common.log import logger
+
+LOGGER = logger.get_logger(__name__)
+
+BITMAP_MAGIC = b'GOLBITS\0'
+BITMAP_HEADER = np.dtype([('magic', 'S8'), ('width', '<u8'), ('height', '<u8')])
+RLE_EXTENSIONS = ('.rle',)
+CELLS_EXTENSIONS = ('.cells',)
+BITMAP_EXTENSIONS = ('.bitmap',)
+PATTERN_EXTENSIONS = RLE_EXTENSIONS + CELLS_EXTENSIONS + BITMAP_EXTENSIONS
+
+_IS_WHITESPACE = np.zeros(256, dtype=bool)
+_IS_WHITESPACE[list(b' \t\r\n')] = True
+_IS_DIGIT = np.zeros(256, dtype=bool)
+_IS_DIGIT[list(b'0123456789')] = True
+_HEADER_PATTERN = re.compile(rb'x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*([^\s,]+))?', re.IGNORECASE)
+
+# Patterns are returned as bool rows, first row being the top of the board, as GameOfLife takes initial state.
+
+
+def _fill_runs(height: int, width: int, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Rows with runs of alive cells at given flat positions, marked by +1/-1 at their ends and summed up."""
+    marks = np.zeros(height * width + 1, dtype=np.int8)
+    # Runs do not overlap, so starts (and ends) are unique, only a start can meet an end of another run.
+    marks[starts] += 1
+    marks[starts + lengths] -= 1
+    return np.cumsum(marks[:-1], dtype=np.int8).view(bool).reshape(height, width)
+
+
+def _run_counts(body: np.ndarray, is_tag: np.ndarray) -> np.ndarray:
+    """Repeat counts written before every tag, 1 for tags without one."""
+    # Numbers are runs of digits, each owned by the tag right after it, as body ends with a tag.
+    starts = np.flatnonzero(~is_tag[1:] & is_tag[:-1]) + 1
+    if len(body) and not is_tag[0]:
+        starts = np.concatenate([[0], starts])
+    ends = np.flatnonzero(~is_tag[:-1] & is_tag[1:]) + 1
+    digits = ends - starts
+    values = body[starts] - np.int64(ord('0'))
+    for position in range(1, int(digits.max()) if len(digits) else 0):
+        inside = np.flatnonzero(digits > position)
+        values[inside] = values[inside] * 10 + (body[starts[inside] + position] - ord('0'))
+    counts = np.ones(int(is_tag.sum()), dtype=np.int64)
+    counts[ends - np.cumsum(digits)] = values
+    return counts
+
+
+def read_rle(path: str) -> Tuple[np.ndarray, Optional[str]]:
+    """Pattern of RLE file and its rule, if the header names one.
+
+    Body is tokenized as a whole byte array: repeat counts are summed from digit values weighted by their position,
+    run starts are cumulative sums of counts since the last $ tag, and runs are filled by a single cumulative sum.
+    States other than b (and . of multistate patterns) are alive.
+    """
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.lstrip().startswith(b'#') or not line.strip():
+                continue
+            header = _HEADER_PATTERN.match(line.strip())
+            if header is None:
+                raise ValueError('RLE file {path} has no header line.'.format(path=path))
+            break
+        else:
+            raise ValueError('RLE file {path} has no header line.'.format(path=path))
+        data = f.read()
+    width, height = int(header.group(1)), int(header.group(2))
+    rule = header.group(3).decode() if header.group(3) else None
+    end = data.find(b'!')
+    # Digits after the last tag belong to no run.
+    body = np.frombuffer((data if end < 0 else data[:end]).rstrip(b'0123456789 \t\r\n'), dtype=np.uint8)
+    body = body[~_IS_WHITESPACE[body]]
+    is_tag = ~_IS_DIGIT[body]
+    counts = _run_counts(body, is_tag)
+    states = body[is_tag]
+    is_row_end = states == ord('$')
+    lengths = np.where(is_row_end, 0, counts)
+    before = np.cumsum(lengths) - lengths
+    # Row of a run is the number of $ tags before it, its x is counted from the cells written before that row.
+    row_ends = np.flatnonzero(is_row_end)
+    runs = np.flatnonzero(~is_row_end & (states != ord('b')) & (states != ord('.')))
+    row = np.searchsorted(row_ends, runs)
+    x = before[runs] - np.concatenate([[0], before[row_ends]])[row]
+    y = np.concatenate([[0], np.cumsum(counts[row_ends])])[row]
+    lengths = lengths[runs]
+    if len(x) and ((x + lengths).max() > width or y.max() >= height):
+        raise ValueError('Pattern of {path} exceeds its header size {w} x {h}.'.format(path=path, w=width, h=height))
+    return _fill_runs(height, width, y * width + x, lengths), rule
+
+
+def read_cells(path: str) -> np.ndarray:
+    """Pattern of plaintext file, lines starting with ! are comments, O (or *) is alive, anything else dead.
+    Rows shorter than the longest one are dead at the end."""
+    data = np.fromfile(path, dtype=np.uint8)
+    if not len(data):
+        return np.zeros((0, 0), dtype=bool)
+    line_ends = np.flatnonzero(data == ord('\n'))
+    if data[-1] != ord('\n'):
+        line_ends = np.append(line_ends, len(data))
+    line_starts = np.concatenate([[0], line_ends[:-1] + 1])
+    is_comment = (line_starts < line_ends) & (data[np.minimum(line_starts, len(data) - 1)] == ord('!'))
+    lengths = line_ends - line_starts
+    lengths -= (lengths > 0) & (data[line_ends - 1] == ord('\r'))
+    row_of_line = np.cumsum(~is_comment) - 1
+    height = int(row_of_line[-1]) + 1
+    width = int(lengths[~is_comment].max()) if height else 0
+    alive = np.flatnonzero((data == ord('O')) | (data == ord('*')))
+    line = np.searchsorted(line_ends, alive)
+    alive, line = alive[~is_comment[line]], line[~is_comment[line]]
+    board = np.zeros((height, width), dtype=bool)
+    board[row_of_line[line], alive - line_starts[line]] = True
+    return board
+
+
+def write_bitmap(path: str, rows: np.ndarray):
+    """Raw bitmap: header of magic, width and height, then rows from the top packed 8 cells per byte."""
+    rows = np.asarray(rows, dtype=bool)
+    header = np.array([(BITMAP_MAGIC, rows.shape[1], rows.shape[0])], dtype=BITMAP_HEADER)
+    with open(path, 'wb') as f:
+        header.tofile(f)
+        np.packbits(rows, axis=1).tofile(f)
+
+
+def read_bitmap(path: str, packed: bool = False) -> np.ndarray:
+    """Pattern of raw bitmap, memory mapped, so packed rows are read lazily and unpacked in one pass.
+
+    :param packed: return memory mapped packed rows (height, ceil(width / 8)) as they are, without unpacking.
+    """
+    header = np.fromfile(path, dtype=BITMAP_HEADER, count=1)
+    if len(header) != 1 or header['magic'][0] != BITMAP_MAGIC.rstrip(b'\0'):
+        raise ValueError('{path} is not a raw bitmap.'.format(path=path))
+    width, height = int(header['width'][0]), int(header['height'][0])
+    rows = np.memmap(path, dtype=np.uint8, mode='r', offset=BITMAP_HEADER.itemsize, shape=(height, -(-width // 8)))
+    if packed:
+        return rows
+    return np.unpackbits(rows, axis=1, count=width).view(bool)
+
+
+def parse_rule(rule: str) -> Dict[str, Any]:
+    """GameOfLife thresholds of B/S (e.g. B3/S23) or S/B (e.g. 23/3) rule.
+
+    Thresholds accept a range of counts only, so birth and survival counts must be contiguous.
+    """
+    match = re.fullmatch(r'[Bb](\d*)/[Ss](\d*)', rule) or re.fullmatch(r'[Ss]?(\d*)/[Bb]?(\d*)', rule)
+    if match is None:
+        raise ValueError('Unknown rule {rule}.'.format(rule=rule))
+    born, survive = match.groups() if rule[0] in 'Bb' else match.groups()[::-1]
+    ranges = []
+    for counts in (sorted(set(map(int, survive))), sorted(set(map(int, born)))):
+        if counts and counts != list(range(counts[0], counts[-1] + 1)):
+            raise ValueError('Rule {rule} has no contiguous range of counts.'.format(rule=rule))
+        # No counts at all make range (1, 0), which no count falls into.
+        ranges.append((counts[0], counts[-1]) if counts else (1, 0))
+    (underpopulation, overpopulation), reproduction = ranges
+    return dict(
+        underpopulation_threshold=underpopulation, overpopulation_threshold=overpopulation,
+        reproduction_range=reproduction
+    )
+
+
+def read_pattern(path: str) -> Tuple[np.ndarray, Optional[str]]:
+    """Pattern of RLE, plaintext or raw bitmap file by its extension, with rule if the file names one."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in RLE_EXTENSIONS:
+        return read_rle(path)
+    if extension in CELLS_EXTENSIONS:
+        return read_cells(path), None
+    if extension in BITMAP_EXTENSIONS:
+        return read_bitmap(path), None
+    raise ValueError('Unknown pattern file format {extension}.'.format(extension=extension))
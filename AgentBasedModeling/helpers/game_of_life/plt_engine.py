@@ -1,11 +1,18 @@
-from typing import Union, Tuple, Iterable, Set
+from typing import Union, Tuple, Iterable, Set, NamedTuple
 
 import AgentBasedModeling.common.shared_cls.square_lat_plt as slp
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
 import AgentBasedModeling.helpers.game_of_life.cell as cell
 
 
-class PlottingEngine(slp.SquareLatticePlotter):
+class LifeSnapshot(NamedTuple):
+    alive: Set[Tuple[int, int]]
+    dead: Set[Tuple[int, int]]
 
+
+class PlottingEngine(slp.SquareLatticePlotter, sr.RecordedReplay):
+
+    frame_duration = 0.6
     _size: Tuple[int, int]
 
     def __init__(
@@ -16,6 +23,17 @@ class PlottingEngine(slp.SquareLatticePlotter):
         self.size = dims
         super().__init__(dims[0], fig_size, out_directory)
 
+    @classmethod
+    def from_recording(cls, recording: sr.StateRecording, out_directory: str) -> 'PlottingEngine':
+        engine = cls(tuple(recording.metadata['size']), out_directory=out_directory)
+        engine.prepare(
+            [tuple(shift) for shift in recording.metadata['neighbours_shifts']], set(recording.metadata['portals'])
+        )
+        return engine
+
+    def draw_recorded(self, frame: sr.Frame):
+        self.draw_snapshot(LifeSnapshot(slp.mask_positions(frame['alive']), slp.mask_positions(~frame['alive'])))
+
     def prepare(self, neighbours_shifts: Iterable[Tuple[int, int]], portals: Set[int]):
         self.handle_out_directory()
         self.create_checker_board()
@@ -117,9 +135,14 @@ class PlottingEngine(slp.SquareLatticePlotter):
     def translate_iterable(any_iter: Iterable[Union[Tuple[int, int], 'cell.Cell']]) -> Iterable[Tuple[int, int]]:
         return set(map(lambda coord: coord.position if isinstance(coord, cell.Cell) else coord, any_iter))
 
+    def draw_snapshot(self, snapshot: LifeSnapshot):
+        self.draw_alive(snapshot.alive)
+        self.draw_dead(snapshot.dead)
+        self.save()
+
     def loop_n_last_pictures(self, n: int = 1, times: int = 1):
-        pictures_subset = self._images_file_paths[-n:]
-        self._images_file_paths.extend(pictures_subset * times)
+        self.submit(self._repeat_last_frames, n, times)
 
-    def animate(self, out_name: str = 'animation.gif', frame_duration=0.6):
-        super().animate(out_name, frame_duration)
+    def _repeat_last_frames(self, n: int, times: int):
+        if self.frame_sink is not None:
+            self.frame_sink.repeat_last(n, times)
@@ -0,0 +1,107 @@
+from typing import Union, Iterable, Tuple, Set
+
+import numpy as np
+
+from AgentBasedModeling.helpers.game_of_life import array_game
+from AgentBasedModeling.common.log import logger
+
+LOGGER = logger.get_logger(__name__)
+
+
+class SparseGameOfLife(array_game.ArrayGameOfLife):
+    """Game of life keeping only living cells, as sorted array of sites x * height + y.
+
+    Board is split into tile_size x tile_size tiles and a generation evaluates only tiles within neighbourhood reach
+    of tiles that changed in the previous one, every other cell keeps its state without being looked at. Within
+    those tiles only living cells and cells they are neighbours of are evaluated, their counts gathered from the
+    living cells around, so step cost follows the activity on the board rather than its area.
+    """
+
+    tile_size: int = 32
+
+    game_state: np.ndarray
+    initial_state: np.ndarray
+    _dirty: np.ndarray
+
+    def _build_board(self, initial_state: Union[np.ndarray, Iterable[Iterable[int]]]):
+        super()._build_board(initial_state)
+        self.game_state = np.flatnonzero(self.game_state)
+        self.initial_state = self.game_state.copy()
+        self._dirty = np.ones((-(-self.width // self.tile_size), -(-self.height // self.tile_size)), dtype=bool)
+
+    @property
+    def living(self) -> Set[Tuple[int, int]]:
+        xs, ys = np.divmod(self.game_state, self.height)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    @property
+    def dead(self) -> Set[Tuple[int, int]]:
+        return set(map(tuple, np.argwhere(~self.alive_array()).tolist()))
+
+    def _tiles_of(self, sites: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        xs, ys = np.divmod(sites, self.height)
+        return xs // self.tile_size, ys // self.tile_size
+
+    def _dilate(self, tiles: np.ndarray) -> np.ndarray:
+        """Tiles within neighbourhood reach of given ones. Wraps on every side, which can only add tiles to evaluate."""
+        x_reach, y_reach = (-(-reach // self.tile_size) for reach in self.reach)
+        dilated = np.zeros_like(tiles)
+        for x_off in range(-x_reach, x_reach + 1):
+            for y_off in range(-y_reach, y_reach + 1):
+                dilated |= np.roll(tiles, (x_off, y_off), axis=(0, 1))
+        return dilated
+
+    def _counted_sites(self, sources: np.ndarray) -> np.ndarray:
+        """Sites having some of the sources for a neighbour, once per such neighbour."""
+        xs, ys = np.divmod(sources, self.height)
+        targets = []
+        for x_off, y_off in self.neighbours_shifts:
+            # Site x - x_off sees the source through shift x_off, crossing the side it would leave by.
+            x, y = xs - x_off, ys - y_off
+            valid = ((x >= 0) | (4 in self._portals)) & ((x < self.width) | (3 in self._portals))
+            valid &= ((y >= 0) | (2 in self._portals)) & ((y < self.height) | (1 in self._portals))
+            targets.append((x[valid] % self.width) * self.height + y[valid] % self.height)
+        return np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+
+    def neighbour_counts(self) -> np.ndarray:
+        """Number of alive neighbours of every site."""
+        counts = np.bincount(self._counted_sites(self.game_state), minlength=self.width * self.height)
+        return counts.reshape(self.width, self.height)
+
+    def _create_next_state(self) -> np.ndarray:
+        if self._reproduction_low <= 0:
+            # Cells without living neighbours are born, no cell can be skipped.
+            return np.flatnonzero(self._next_alive(self.alive_array(), self.neighbour_counts()))
+        active = self._dilate(self._dirty)
+        tiles_x, tiles_y = self._tiles_of(self.game_state)
+        in_active = active[tiles_x, tiles_y]
+        living = self.game_state[in_active]
+        sources = self.game_state[self._dilate(active)[tiles_x, tiles_y]]
+        targets = self._counted_sites(sources)
+        targets = targets[active[self._tiles_of(targets)]]
+        # Living cells are added once more, so the ones without any living neighbour are evaluated as well.
+        sites, counts = np.unique(np.concatenate([targets, living]), return_counts=True)
+        alive = np.isin(sites, living, assume_unique=True)
+        return np.union1d(self.game_state[~in_active], sites[self._next_alive(alive, counts - alive)])
+
+    def _board_of(self, state: np.ndarray) -> np.ndarray:
+        """Sorted living sites are hashed as they are, see BoardHistory.digest."""
+        return state
+
+    def alive_array(self) -> np.ndarray:
+        board = np.zeros((self.width, self.height), dtype=bool)
+        board.flat[self.game_state] = True
+        return board
+
+    def _state_of(self, board: np.ndarray) -> np.ndarray:
+        return np.flatnonzero(board)
+
+    def _apply_state(self, next_state: np.ndarray):
+        self._dirty = np.zeros_like(self._dirty)
+        self._dirty[self._tiles_of(np.setxor1d(self.game_state, next_state, assume_unique=True))] = True
+        self.game_state = next_state
+
+    def _replace_state(self, state: np.ndarray):
+        """Tiles unchanged by a jump may still be active, so all of them are evaluated again."""
+        self._apply_state(state)
+        self._dirty = np.ones_like(self._dirty)
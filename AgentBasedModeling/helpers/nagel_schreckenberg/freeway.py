@@ -4,6 +4,7 @@ import math
 import random
 
 from AgentBasedModeling.helpers.nagel_schreckenberg import lane as l, car as c, plotting_engine as pe
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
 
 
 class Freeway:
@@ -12,6 +13,7 @@ class Freeway:
     cars: Set[c.Car]
     cells_cars: Dict[l.c.Cell, c.Car]
     plotting_engine: Optional[pe.PlottingEngine]
+    _recorder: Optional[sr.StateRecorder]
 
     def __init__(
             self,
@@ -41,6 +43,17 @@ class Freeway:
             self.plotting_engine.setup_velocity_axes()
         else:
             self.plotting_engine = None
+        self.recorder = None
+
+    @property
+    def recorder(self) -> Optional[sr.StateRecorder]:
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, rec: Optional[sr.StateRecorder]):
+        self._recorder = rec
+        if rec is not None:
+            rec.describe(pe.PlottingEngine, number_of_lanes=self.lanes_n, r=self.lane_length / 2 / math.pi)
 
     @property
     def mean_velocity(self):
@@ -66,14 +79,21 @@ class Freeway:
 
     def process_plotting(self):
         if self.plotting_engine is not None:
-            self.plotting_engine.clear_main_axes()
-            self.plotting_engine.process_velocity_axes(self.mean_velocity)
-            for car in self.cars:
-                self.plotting_engine.draw_circle(car.cell.position, car.id, "red", 1)
-            self.plotting_engine.save()
+            self.plotting_engine.submit_snapshot(pe.FreewaySnapshot(
+                self.mean_velocity, [(car.cell.position, car.id) for car in self.cars]
+            ))
+
+    def process_recorder(self):
+        if self.recorder is not None:
+            cars = sorted(self.cars, key=lambda car: car.id)
+            self.recorder.record(
+                positions=[car.cell.position for car in cars], velocities=[car.velocity for car in cars],
+                labels=[car.id for car in cars], mean_velocity=self.mean_velocity
+            )
 
     def process(self):
         self.process_plotting()
+        self.process_recorder()
         for car in self.cars:
             if car.velocity < self.lanes[car.lane_no].speed_limit:
                 car.velocity += 1
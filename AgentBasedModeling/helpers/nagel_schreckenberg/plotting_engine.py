@@ -1,17 +1,29 @@
 import os
 import time
-from typing import Tuple, Iterable, Dict, Set
+from typing import Tuple, Iterable, Dict, Set, Optional, List, NamedTuple
 
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import matplotlib.gridspec as grd
 import AgentBasedModeling.common.log.logger as log
-import imageio as iio
+import AgentBasedModeling.common.shared_cls.frame_sink as fs
+import AgentBasedModeling.common.shared_cls.frame_pipeline as fp
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
 
 LOGGER = log.get_logger(__name__)
 
 
-class PlottingEngine:
+class FreewaySnapshot(NamedTuple):
+    mean_velocity: float
+    cars: List[Tuple[Tuple[float, float], str]]
+
+
+class PlottingEngine(fp.BackgroundRendering, sr.RecordedReplay):
+
+    frame_duration: float = 0.8
+    keep_frames: bool = False
+    frame_sink: Optional[fs.FrameSink]
+    history_fields = ('mean_velocity',)
 
     def __init__(self, number_of_lanes: int, r: float, out_directory: 'str' = 'Results'):
         self.first_r = r
@@ -25,9 +37,25 @@ class PlottingEngine:
         self._images_created_counter = 0
         self._out_directory = out_directory
         self.font_size = 8 * self.figure.dpi // 80
-        self._images_file_paths = []
+        self.frame_sink = None
         self.velocities = []
 
+    @classmethod
+    def from_recording(cls, recording: sr.StateRecording, out_directory: str) -> 'PlottingEngine':
+        engine = cls(recording.metadata['number_of_lanes'], recording.metadata['r'], out_directory)
+        engine.handle_out_directory()
+        engine.setup_base_axes()
+        engine.setup_velocity_axes()
+        return engine
+
+    def skip_recorded(self, frame: sr.Frame):
+        self.velocities.append(float(frame['mean_velocity']))
+
+    def draw_recorded(self, frame: sr.Frame):
+        self.draw_snapshot(FreewaySnapshot(float(frame['mean_velocity']), [
+            (tuple(position), label) for position, label in zip(frame['positions'].tolist(), frame['labels'].tolist())
+        ]))
+
     def handle_out_directory(self):
         tries = 1
         directory_template = self._out_directory + '_{no_try}'
@@ -73,15 +101,23 @@ class PlottingEngine:
         self.velocity_axis.clear()
         self.velocity_axis.plot(self.velocities)
 
+    def draw_snapshot(self, snapshot: FreewaySnapshot):
+        self.clear_main_axes()
+        self.process_velocity_axes(snapshot.mean_velocity)
+        for position, label in snapshot.cars:
+            self.draw_circle(position, label, "red", 1)
+        self.save()
+
     def save(self):
-        self.figure.canvas.draw()
         self._images_created_counter += 1
-        file_name = os.path.join(self._out_directory, '{num:0>5}.png'.format(num=self._images_created_counter))
-        self.figure.savefig(file_name)
-        self._images_file_paths.append(file_name)
-
-    def animate(self, out_name: str = 'animation.gif', frame_duration=0.8):
-        with iio.get_writer(os.path.join(self._out_directory, out_name), mode='I', duration=frame_duration) as w:
-            for file in self._images_file_paths:
-                w.append_data(iio.imread(file))
+        if self.frame_sink is None:
+            self.frame_sink = fs.FrameSink(
+                self._out_directory, frame_duration=self.frame_duration, keep_frames=self.keep_frames
+            )
+        self.frame_sink.append(self.figure)
+
+    def animate(self, out_name: str = 'animation.gif', frame_duration: Optional[float] = None):
+        self.close_frames()
+        if self.frame_sink is not None:
+            self.frame_sink.finish(out_name, frame_duration)
 
@@ -1,14 +1,29 @@
 import os
-from typing import Tuple
+from typing import Tuple, Optional, List, Any, NamedTuple
 
 import matplotlib.pyplot as plt
 
-import imageio as iio
+import AgentBasedModeling.common.shared_cls.frame_sink as fs
+import AgentBasedModeling.common.shared_cls.frame_pipeline as fp
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
+from AgentBasedModeling.helpers.reynolds import boid as b, obstacle as o
 
 
-class PlottingEngine:
+class FlockSnapshot(NamedTuple):
+    """Copies of boids and obstacles of a single frame, both drawn by their own draw methods."""
 
+    obstacles: List[Any]
+    boids: List[Any]
+    show_neighbourhood: bool
+
+
+class PlottingEngine(fp.BackgroundRendering, sr.RecordedReplay):
+
+    frame_duration: float = 0.3
+    keep_frames: bool = False
+    frame_sink: Optional[fs.FrameSink]
     _images_created_counter: int
+    recorded_obstacles: List[o.Obstacle]
 
     def __init__(self, grid_length: float, fig_size: Tuple[float, float] = (6, 8), out_directory: str = 'Results'):
         """Create plotting object that handles clearing, saving and animating.
@@ -25,7 +40,29 @@ class PlottingEngine:
         self._images_created_counter = 0
         self._out_directory = out_directory
         self.font_size = fig_size[1] * self.figure.dpi // 80
-        self._images_file_paths = []
+        self.frame_sink = None
+        self.recorded_obstacles = []
+
+    @classmethod
+    def from_recording(cls, recording: sr.StateRecording, out_directory: str) -> 'PlottingEngine':
+        """Engine drawing frames recorded by ReynoldsModel."""
+        engine = cls(recording.metadata['board_size'], out_directory=out_directory)
+        engine.remove_ticks()
+        engine.handle_out_directory()
+        engine.recorded_obstacles = [
+            o.Obstacle(*[tuple(point) for point in points]) for points in recording.metadata['obstacles']
+        ]
+        return engine
+
+    def draw_recorded(self, frame: sr.Frame):
+        """Draw recorded frame, boids are rebuilt with zero velocity as it is not drawn."""
+        boids = [
+            b.Boid(x, y, look_up_distance, look_up_angle, 0, direction)
+            for x, y, direction, (look_up_distance, look_up_angle) in zip(
+                frame['x'].tolist(), frame['y'].tolist(), frame['direction'].tolist(), frame['look_up'].tolist()
+            )
+        ]
+        self.draw_snapshot(FlockSnapshot(self.recorded_obstacles, boids, bool(frame['show_neighbourhood'])))
 
     def handle_out_directory(self):
         """Create directory for saving."""
@@ -50,15 +87,30 @@ class PlottingEngine:
         self.axis.set_xlim(0, self.grid_length)
         self.axis.set_ylim(0, self.grid_length)
 
+    def draw_snapshot(self, snapshot: FlockSnapshot):
+        """Draw whole frame from snapshot and save it."""
+        self.reset()
+        for obstacle in snapshot.obstacles:
+            obstacle.draw(self.axis)
+        for boid in snapshot.boids:
+            boid.draw(self.axis, snapshot.show_neighbourhood)
+        self.save()
+
     def save(self):
-        """Save single image."""
+        """Stream single frame into the animation, PNG file is written only with keep_frames."""
         self._images_created_counter += 1
-        file_name = os.path.join(self._out_directory, '{num:0>5}.png'.format(num=self._images_created_counter))
-        self.figure.savefig(file_name)
-        self._images_file_paths.append(file_name)
-
-    def animate(self, out_name: str = 'animation.gif', frame_duration=0.3):
-        """Create animation from all saved images."""
-        with iio.get_writer(os.path.join(self._out_directory, out_name), mode='I', duration=frame_duration) as w:
-            for file in self._images_file_paths:
-                w.append_data(iio.imread(file))
+        if self.frame_sink is None:
+            self.frame_sink = fs.FrameSink(
+                self._out_directory, frame_duration=self.frame_duration, keep_frames=self.keep_frames
+            )
+        self.frame_sink.append(self.figure)
+
+    def animate(self, out_name: str = 'animation.gif', frame_duration: Optional[float] = None):
+        """Finish animation of all saved frames.
+
+        :param out_name: animation file name.
+        :param frame_duration: seconds per frame, class frame_duration if None.
+        """
+        self.close_frames()
+        if self.frame_sink is not None:
+            self.frame_sink.finish(out_name, frame_duration)
@@ -1,7 +1,9 @@
 from typing import List, Tuple, Union, Optional
+import copy
 import math
 import random
 from AgentBasedModeling.helpers.reynolds import boid as b, obstacle as o, plotting_engine as pe
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
 
 
 EPS = 10 ** -2
@@ -11,6 +13,7 @@ class ReynoldsModel:
 
     boids: List[b.Boid]
     obstacles: List[o.Obstacle]
+    _recorder: Optional[sr.StateRecorder]
 
     def __init__(
             self,
@@ -43,6 +46,21 @@ class ReynoldsModel:
         self.plotting_engine = pe.PlottingEngine(self.board_size, **kwargs)
         self.boids = []
         self.obstacles = []
+        self._recorder = None
+
+    @property
+    def recorder(self) -> Optional[sr.StateRecorder]:
+        """Recorder of boids state, set it once obstacles are added."""
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, rec: Optional[sr.StateRecorder]):
+        self._recorder = rec
+        if rec is not None:
+            rec.describe(
+                pe.PlottingEngine, board_size=self.board_size,
+                obstacles=[[list(point) for point in obstacle.points] for obstacle in self.obstacles]
+            )
 
     def add_obstacle(self, *points: Tuple[float, float]):
         """Add obstacle as polygon from points.
@@ -139,13 +157,26 @@ class ReynoldsModel:
                 self.boid_omit_obstacle(boid, obstacle)
             boid.move(self.board_size)
 
-    def simulate(self, n: int, show_neighbourhood: bool = False):
-        """Process the boids n times. Also save images."""
-        self.draw_current_state(show_neighbourhood)
+    def simulate(self, n: int, show_neighbourhood: bool = False, draw: bool = True):
+        """Process the boids n times. Also save images, unless draw is off, e.g. when only recording."""
+        self.process_state(show_neighbourhood, draw)
         for _ in range(n):
             self.move()
+            self.process_state(show_neighbourhood, draw)
+        if draw:
+            self.plotting_engine.animate()
+
+    def process_state(self, show_neighbourhood: bool = False, draw: bool = True):
+        """Hand current state to the plotting engine and recorder."""
+        if draw:
             self.draw_current_state(show_neighbourhood)
-        self.plotting_engine.animate()
+        if self.recorder is not None:
+            self.recorder.record(
+                x=[boid.x for boid in self.boids], y=[boid.y for boid in self.boids],
+                direction=[boid.direction for boid in self.boids],
+                look_up=[(boid.lu_distance, boid.lu_angle) for boid in self.boids],
+                show_neighbourhood=show_neighbourhood
+            )
 
     def _create_velocities(self):
         """Calculate velocity for each boid, considering all basic rules."""
@@ -233,13 +264,10 @@ class ReynoldsModel:
         self.plotting_engine.handle_out_directory()
 
     def draw_current_state(self, show_neighbourhood: bool = False):
-        """Process plotting."""
-        self.plotting_engine.reset()
-        for obstacle in self.obstacles:
-            obstacle.draw(self.plotting_engine.axis)
-        for boid in self.boids:
-            boid.draw(self.plotting_engine.axis, show_neighbourhood)
-        self.plotting_engine.save()
+        """Hand copy of current state to plotting engine, which may draw it in background."""
+        self.plotting_engine.submit_snapshot(pe.FlockSnapshot(
+            list(self.obstacles), [copy.copy(boid) for boid in self.boids], show_neighbourhood
+        ))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+from typing import Collection, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from AgentBasedModeling.helpers.schellings import schellings_model as sm, plt_engine
+import AgentBasedModeling.common.shared_cls.square_lat_plt as slp
+from AgentBasedModeling.common.log import logger
+
+LOGGER = logger.get_logger(__name__)
+
+EMPTY = -1
+
+
+class ArraySchellingModel(sm.SchellingModel):
+    """Schelling's model keeping the grid as int8 array of agent types (positions in agent_names), EMPTY if empty.
+
+    Neighbours of every type around every cell are held in (types, grid_length, grid_length) tensor, computed by
+    wrapped convolution with the (2d + 1)^2 stencil, so happiness and SNI of all agents are masks over the tensor.
+    Agents are numbered by site x * grid_length + y.
+
+    Unlike SchellingModel, which moves agents one by one, every iteration of simulate moves all agents unhappy when
+    it starts at once, to empty sites of that moment, and convolves the counts again.
+    """
+
+    grid: np.ndarray
+    counts: np.ndarray
+    occupied_counts: np.ndarray
+    _thresholds_array: np.ndarray
+    _rng: np.random.Generator
+
+    def __init__(
+            self,
+            grid_length: int,
+            neighbourhood_depth: int,
+            agents_counts: Collection[int],
+            agents_happiness_thresholds: Union[int, Collection[int]],
+            agents_names: Optional[Collection[Union[str, int]]] = None,
+            plot: bool = False,
+            seed: Optional[int] = None,
+            **kwargs
+    ):
+        self._rng = np.random.default_rng(seed)
+        super().__init__(
+            grid_length, neighbourhood_depth, agents_counts, agents_happiness_thresholds, agents_names, plot, **kwargs
+        )
+
+    def _populate(self, agents_counts: Collection[int]):
+        if self.grid_length < 2 * self.neighbourhood_depth + 1:
+            raise ValueError('Grid of length {l} is narrower than neighbourhood of depth {d}.'.format(
+                l=self.grid_length, d=self.neighbourhood_depth
+            ))
+        if self.types_count > np.iinfo(np.int8).max:
+            raise ValueError('Array model holds at most {n} agent types.'.format(n=np.iinfo(np.int8).max))
+        self.grid = np.full((self.grid_length, self.grid_length), EMPTY, dtype=np.int8)
+        sites = self._rng.choice(self.grid_length ** 2, sum(agents_counts), replace=False)
+        self.grid.flat[sites] = np.repeat(np.arange(self.types_count), list(agents_counts))
+        self._thresholds_array = np.array(self.thresholds, dtype=float)
+        self.create_cells_links()
+
+    def create_cells_links(self):
+        """Cells are linked by the stencil itself, only the counts are computed."""
+        self.counts = self.neighbour_counts()
+        self.occupied_counts = self.counts.sum(axis=0)
+
+    def neighbour_counts(self) -> np.ndarray:
+        """Agents of every type around every cell by wrapped box sum over the grid, less the cell itself."""
+        agents = (self.grid == np.arange(self.types_count, dtype=np.int8)[:, None, None]).astype(np.int16)
+        reach = range(-self.neighbourhood_depth, self.neighbourhood_depth + 1)
+        columns = sum(np.roll(agents, shift, axis=1) for shift in reach)
+        return sum(np.roll(columns, shift, axis=2) for shift in reach) - agents
+
+    def same_counts(self) -> np.ndarray:
+        """Neighbours of the same type as the agent of every cell, 0 for empty cells."""
+        same = np.take_along_axis(self.counts, np.maximum(self.grid, 0)[None].astype(np.intp), axis=0)[0]
+        return np.where(self.grid == EMPTY, 0, same)
+
+    def happy_mask(self) -> np.ndarray:
+        """Occupied cells whose agents are happy, as Cell.is_agent_happy tells."""
+        occupied = self.grid != EMPTY
+        thresholds = self._thresholds_array[np.maximum(self.grid, 0)]
+        return occupied & ((self.same_counts() >= thresholds) | (self.occupied_counts == 0))
+
+    def is_agent_happy(self, agent: int) -> bool:
+        return bool(self.happy_mask().flat[agent])
+
+    def is_everyone_happy(self) -> bool:
+        return bool(np.array_equal(self.happy_mask(), self.grid != EMPTY))
+
+    def get_occupied_split(self) -> Collection[Collection[Tuple[int, int]]]:
+        return [slp.mask_positions(self.grid == agent_type) for agent_type in range(self.types_count)]
+
+    def process_plotting(self):
+        if self.plotting_engine is not None:
+            self.plotting_engine.submit_snapshot(plt_engine.SegregationSnapshot(
+                slp.mask_positions(self.grid == EMPTY), self.get_occupied_split()
+            ))
+
+    def process_recorder(self):
+        if self.recorder is not None:
+            self.recorder.record(agents=self.grid.copy())
+
+    def get_sni(self) -> Dict[Union[str, int], float]:
+        occupied = self.occupied_counts
+        index = np.where(occupied == 0, 1., self.same_counts() / np.maximum(occupied, 1))
+        types = self.grid.ravel()
+        sums = np.bincount(types[types != EMPTY], weights=index.ravel()[types != EMPTY], minlength=self.types_count)
+        agents = np.bincount(types[types != EMPTY], minlength=self.types_count)
+        return {name: sums[i] / agents[i] for i, name in enumerate(self.agent_names) if agents[i]}
+
+    def move_unhappy_agents(self, movement_type: str, max_check_places: int) -> int:
+        """Single iteration of simulate, all agents unhappy when it starts move at once. Returns number of moves."""
+        unhappy = np.flatnonzero(((self.grid != EMPTY) & ~self.happy_mask()).ravel())
+        moved = 0
+        if movement_type == 'random':
+            moved = self.move_agent_random(unhappy)
+        elif movement_type == 'happy':
+            moved = self.move_agent_happy(unhappy, max_check_places)
+        return moved
+
+    def _move(self, sources: np.ndarray, targets: np.ndarray) -> int:
+        """Agents of source sites go to distinct empty target sites, counts are convolved again."""
+        self.grid.flat[targets] = self.grid.flat[sources]
+        self.grid.flat[sources] = EMPTY
+        self.counts = self.neighbour_counts()
+        self.occupied_counts = self.counts.sum(axis=0)
+        return len(sources)
+
+    def move_agent_random(self, agents: np.ndarray) -> int:
+        """Every agent goes to a different random empty site, as long as there are enough of them, the ones to move
+        chosen at random otherwise."""
+        empties = self._rng.permutation(np.flatnonzero(self.grid.ravel() == EMPTY))
+        agents = self._rng.permutation(agents)[:len(empties)]
+        return self._move(agents, empties[:len(agents)])
+
+    def move_agent_happy(self, agents: np.ndarray, max_check_places: int) -> int:
+        """Every agent goes to the first of max_check_places random empty sites it would be happy at, as the counts
+        are when the iteration starts. Agents choosing the same site are served in random order, the others stay."""
+        empties = np.flatnonzero(self.grid.ravel() == EMPTY)
+        if not len(agents) or not len(empties):
+            return 0
+        agents = self._rng.permutation(agents)
+        agent_types = self.grid.flat[agents][:, None].astype(np.intp)
+        places = empties[self._rng.integers(len(empties), size=(len(agents), max_check_places))]
+        same = self.counts.take(agent_types * self.grid.size + places)
+        happy = (same >= self._thresholds_array[agent_types]) | (self.occupied_counts.take(places) == 0)
+        found = np.flatnonzero(happy.any(axis=1))
+        chosen = places[found, happy[found].argmax(axis=1)]
+        _, first = np.unique(chosen, return_index=True)
+        return self._move(agents[found[first]], chosen[first])
@@ -1,16 +1,26 @@
+import collections
 from typing import Tuple, Iterable, Set, Dict, Optional, Union
 
 
 class Cell:
+    """Cell of the grid, with counts of agents of every type among its neighbours.
+
+    Counts follow the agents as long as they are changed by set_agent, so happiness and segregation index take
+    constant time.
+    """
 
     agent: Optional[str]
     neighbours: Set['Cell']
+    counts: Dict[Union[int, str], int]
+    occupied_count: int
 
     def __init__(self, x: int, y: int, agent: Optional[str] = None):
         self.x = x
         self.y = y
         self.agent = agent
         self.neighbours = set()
+        self.counts = collections.Counter()
+        self.occupied_count = 0
 
     @property
     def position(self):
@@ -22,48 +32,34 @@ class Cell:
         self.y = set_val[1]
 
     def add_neighbours(self, neighbours: Iterable['Cell']):
-        self.neighbours.update(neighbours)
+        for c in set(neighbours) - self.neighbours:
+            self.neighbours.add(c)
+            if c.agent is not None:
+                self.counts[c.agent] += 1
+                self.occupied_count += 1
 
-    def is_agent_happy(self, happiness_factor: int) -> bool:
-        happiness_counter = 0
-        other_counter = 0
+    def set_agent(self, agent: Optional[Union[int, str]]):
+        """Change the agent of the cell and the counts of its neighbours, which have the cell for a neighbour too."""
         for c in self.neighbours:
-            if c.agent == self.agent:
-                happiness_counter += 1
-            elif c.agent is not None:
-                other_counter += 1
-            if happiness_counter >= happiness_factor:
-                return True
-        if other_counter + happiness_counter == 0:
-            return True
-        return False
-
-    def would_be_happy(self, agent_type: Union[int, str], happiness_factor: int):
-        happiness_counter = 0
-        other_counter = 0
-        for c in self.neighbours:
-            if c.agent == agent_type:
-                happiness_counter += 1
-            elif c.agent is not None:
-                other_counter += 1
-            if happiness_counter >= happiness_factor:
-                return True
-        if other_counter + happiness_counter == 0:
-            return True
-        return False
+            if self.agent is not None:
+                c.counts[self.agent] -= 1
+                c.occupied_count -= 1
+            if agent is not None:
+                c.counts[agent] += 1
+                c.occupied_count += 1
+        self.agent = agent
+
+    def is_agent_happy(self, happiness_factor: int) -> bool:
+        return self.would_be_happy(self.agent, happiness_factor)
+
+    def would_be_happy(self, agent_type: Union[int, str], happiness_factor: int) -> bool:
+        return self.counts[agent_type] >= happiness_factor or self.occupied_count == 0
 
     def segregation_index(self):
-        happiness_counter = 0
-        other_counter = 0
-        for c in self.neighbours:
-            if c.agent == self.agent:
-                happiness_counter += 1
-            elif c.agent is not None:
-                other_counter += 1
-        if other_counter + happiness_counter == 0:
+        if self.occupied_count == 0:
             return 1
         else:
-            return happiness_counter / (other_counter + happiness_counter)
+            return self.counts[self.agent] / self.occupied_count
 
     def __eq__(self, other: 'Cell'):
         return self.position == other.position
@@ -1,11 +1,17 @@
-from typing import Tuple, Iterable, Union
+from typing import Tuple, Iterable, Union, Set, List, NamedTuple
 
 import AgentBasedModeling.common.shared_cls.square_lat_plt as slp
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
 from AgentBasedModeling.helpers.schellings import cell
 from matplotlib import cm
 
 
-class PlottingEngine(slp.SquareLatticePlotter):
+class SegregationSnapshot(NamedTuple):
+    empties: Set[Tuple[int, int]]
+    groups: List[Set[Tuple[int, int]]]
+
+
+class PlottingEngine(slp.SquareLatticePlotter, sr.RecordedReplay):
 
     def __init__(
             self,
@@ -19,6 +25,20 @@ class PlottingEngine(slp.SquareLatticePlotter):
         self.colours = cm.get_cmap('tab10')(range(self.number_groups))
         self.figure.set_dpi(50)
 
+    @classmethod
+    def from_recording(cls, recording: sr.StateRecording, out_directory: str) -> 'PlottingEngine':
+        metadata = recording.metadata
+        engine = cls(metadata['grid_length'], metadata['groups_count'], out_directory=out_directory)
+        engine.prepare(metadata['thresholds'], metadata['max_neighbours'])
+        return engine
+
+    def draw_recorded(self, frame: sr.Frame):
+        agents = frame['agents']
+        self.draw_snapshot(SegregationSnapshot(
+            slp.mask_positions(agents == -1),
+            [slp.mask_positions(agents == group) for group in range(self.number_groups)]
+        ))
+
     def prepare(self, happiness_thresholds: Iterable[int], max_neighbours: int):
         self.handle_out_directory()
         self.create_checker_board()
@@ -57,6 +77,11 @@ class PlottingEngine(slp.SquareLatticePlotter):
         for i, group_coords in enumerate(groups):
             self.colour_rectangles(PlottingEngine.translate_iterable(group_coords), self.colours[i])
 
+    def draw_snapshot(self, snapshot: SegregationSnapshot):
+        self.draw_empties(snapshot.empties)
+        self.draw_groups(snapshot.groups)
+        self.save()
+
     @staticmethod
     def translate_iterable(any_iter: Iterable[Union[Tuple[int, int], 'cell.Cell']]) -> Iterable[Tuple[int, int]]:
         return set(map(lambda coord: coord.position if isinstance(coord, cell.Cell) else coord, any_iter))
@@ -67,8 +92,7 @@ class PlottingEngine(slp.SquareLatticePlotter):
 
 
 if __name__ == '__main__':
-    pe = PlottingEngine(1, 1, out_directory='Results_2')
-    pe._images_file_paths = [
-        slp.os.path.join('Results_2', '{num:0>5}.png'.format(num=i)) for i in range(1, 501)
-    ]
-    pe.animate()
+    slp.fs.encode_files(
+        [slp.os.path.join('Results_2', '{num:0>5}.png'.format(num=i)) for i in range(1, 501)],
+        slp.os.path.join('Results_2', 'animation.gif'), PlottingEngine.frame_duration
+    )
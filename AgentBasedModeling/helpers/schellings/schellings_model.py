@@ -1,16 +1,30 @@
-from typing import Set, Union, Optional, Collection, Dict, Tuple, List
-from AgentBasedModeling.helpers.schellings import cell, plt_engine
+from typing import Set, Union, Optional, Collection, Dict, List, Iterable
+from AgentBasedModeling.helpers.schellings import cell, plt_engine, vacancy_pool as vp
+import AgentBasedModeling.common.shared_cls.state_recorder as sr
+import AgentBasedModeling.common.shared_cls.neighbour_table as nt
+import numpy as np
+import itertools
 import random
 
 
 class SchellingModel:
+    """Schelling's model of agents as cell.Cell objects.
+
+    Cells count agents of every type around them, updated by every move, and the model keeps the set of unhappy
+    agents and sums of segregation indices of every type up to date around the two cells of a move. Convergence
+    check and SNI take constant time and an iteration of simulate looks at the agents unhappy when it starts only.
+    """
 
     _thresholds: Collection[int]
     _agent_names: Collection[Union[int, str]]
     plotting_engine: Optional[plt_engine.PlottingEngine]
+    _recorder: Optional[sr.StateRecorder]
     name_to_threshold: Dict[Union[str, int, None], int]
-    empties: Set[cell.Cell]
+    empties: vp.VacancyPool[cell.Cell]
     occupied: Set[cell.Cell]
+    unhappy: Set[cell.Cell]
+    _sni_sums: Dict[Union[str, int], float]
+    _agents_counts: Dict[Union[str, int], int]
 
     def __init__(
             self,
@@ -28,17 +42,13 @@ class SchellingModel:
         self.thresholds = agents_happiness_thresholds
         self.agent_names = agents_names
         self.name_to_threshold = {name: th for name, th in zip(self.agent_names, self.thresholds)}
-        _temp_cells = {cell.Cell(x, y) for x in range(self.grid_length) for y in range(self.grid_length)}
-        _temp_agents = [self.agent_names[i] for i in range(self.types_count) for _ in range(agents_counts[i])]
-        self.occupied = set(random.sample(_temp_cells, sum(agents_counts)))
-        self.empties = _temp_cells - self.occupied
-        for i, c in enumerate(self.occupied):
-            c.agent = _temp_agents[i]
+        self._populate(agents_counts)
         if plot:
             self.plotting_engine = plt_engine.PlottingEngine(self.grid_length, groups_count=self.types_count, **kwargs)
             self.plotting_engine.prepare(self.thresholds, (self.neighbourhood_depth * 2 + 1) ** 2 - 1)
         else:
             self.plotting_engine = None
+        self.recorder = None
 
     @property
     def thresholds(self) -> Collection[int]:
@@ -62,29 +72,79 @@ class SchellingModel:
         else:
             self._agent_names = [name for name in set_val]
 
+    @property
+    def recorder(self) -> Optional[sr.StateRecorder]:
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, rec: Optional[sr.StateRecorder]):
+        self._recorder = rec
+        if rec is not None:
+            rec.describe(
+                plt_engine.PlottingEngine, grid_length=self.grid_length, groups_count=self.types_count,
+                thresholds=list(self.thresholds), max_neighbours=(self.neighbourhood_depth * 2 + 1) ** 2 - 1
+            )
+
+    def _populate(self, agents_counts: Collection[int]):
+        """Place agents of every type on random cells of the grid."""
+        _temp_cells = [cell.Cell(x, y) for x in range(self.grid_length) for y in range(self.grid_length)]
+        _temp_agents = [self.agent_names[i] for i in range(self.types_count) for _ in range(agents_counts[i])]
+        self.occupied = set(random.sample(_temp_cells, sum(agents_counts)))
+        self.empties = vp.VacancyPool(c for c in _temp_cells if c not in self.occupied)
+        for i, c in enumerate(self.occupied):
+            c.agent = _temp_agents[i]
+        self._agents_counts = {name: count for name, count in zip(self.agent_names, agents_counts)}
+        self._track_all()
+
     def create_cells_links(self):
-        shifts = {
+        shifts = tuple(
             (x, y)
             for x in range(-self.neighbourhood_depth, self.neighbourhood_depth + 1)
             for y in range(-self.neighbourhood_depth, self.neighbourhood_depth + 1)
-        }
-        shifts.remove((0, 0))
-        for c in self.empties | self.occupied:
-            self._link_cell(c, shifts)
-
-    def _link_cell(self, c: cell.Cell, shifts: Collection[Tuple[int, int]]):
-        c_x, c_y = c.position
-        to_link_positions = {
-            ((c_x + x_off) % self.grid_length, (c_y + y_off) % self.grid_length)
-            for x_off, y_off in shifts
-        }
-        c.add_neighbours({n_cell for n_cell in self.empties | self.occupied if n_cell.position in to_link_positions})
+            if (x, y) != (0, 0)
+        )
+        table = nt.neighbour_table(self.grid_length, self.grid_length, shifts)
+        by_site = [None] * self.grid_length ** 2
+        for c in itertools.chain(self.empties, self.occupied):
+            by_site[table.site(*c.position)] = c
+        for c, neighbours in zip(by_site, table.rows()):
+            c.add_neighbours([by_site[site] for site in neighbours])
+        self._track_all()
+
+    def _track_all(self):
+        self.unhappy = set()
+        self._sni_sums = {agent_type: 0. for agent_type in self.agent_names}
+        self._track(self.occupied)
+
+    def _track(self, cells: Iterable[cell.Cell]):
+        """Add agents of the cells to the unhappy set and SNI sums."""
+        for c in cells:
+            if c.agent is not None:
+                self._sni_sums[c.agent] += c.segregation_index()
+                if not c.is_agent_happy(self.name_to_threshold[c.agent]):
+                    self.unhappy.add(c)
+
+    def _untrack(self, cells: Iterable[cell.Cell]):
+        for c in cells:
+            if c.agent is not None:
+                self._sni_sums[c.agent] -= c.segregation_index()
+                self.unhappy.discard(c)
+
+    def _relocate(self, source: cell.Cell, target: cell.Cell):
+        """Move agent of source cell to empty target cell, only agents around the two cells are tracked again."""
+        affected = source.neighbours | target.neighbours | {source, target}
+        self._untrack(affected)
+        agent = source.agent
+        source.set_agent(None)
+        target.set_agent(agent)
+        self._track(affected)
+        self.occupied.remove(source)
+        self.occupied.add(target)
+        self.empties.remove(target)
+        self.empties.add(source)
 
     def is_everyone_happy(self) -> bool:
-        for c in self.occupied:
-            if not c.is_agent_happy(self.name_to_threshold[c.agent]):
-                return False
-        return True
+        return not self.unhappy
 
     def get_occupied_split(self) -> Collection[Collection['cell.Cell']]:
         _d = {agent_type: [] for agent_type in self.agent_names}
@@ -94,15 +154,23 @@ class SchellingModel:
 
     def process_plotting(self):
         if self.plotting_engine is not None:
-            self.plotting_engine.draw_empties(self.empties)
-            self.plotting_engine.draw_groups(self.get_occupied_split())
-            self.plotting_engine.save()
+            translate = plt_engine.PlottingEngine.translate_iterable
+            self.plotting_engine.submit_snapshot(plt_engine.SegregationSnapshot(
+                translate(self.empties), [translate(group) for group in self.get_occupied_split()]
+            ))
+
+    def process_recorder(self):
+        if self.recorder is not None:
+            agents = np.full((self.grid_length, self.grid_length), -1, dtype=np.int8)
+            for group_no, group in enumerate(self.get_occupied_split()):
+                for c in group:
+                    agents[c.position] = group_no
+            self.recorder.record(agents=agents)
 
     def get_sni(self) -> Dict[str, float]:
-        _d = {agent_type: [] for agent_type in self.agent_names}
-        for agent in self.occupied:
-            _d[agent.agent].append(agent.segregation_index())
-        return {agent_type: sum(indices) / len(indices) for agent_type, indices in _d.items()}
+        return {
+            agent_type: self._sni_sums[agent_type] / self._agents_counts[agent_type] for agent_type in self.agent_names
+        }
 
     def simulate(
             self,
@@ -115,6 +183,7 @@ class SchellingModel:
         save_step = max_iter + 1 if process_others_step is None else process_others_step
         sni = {agent_type: [] for agent_type in self.agent_names}
         for step_no in range(max_iter):
+            self.process_recorder()
             if (step_no + 1) % save_step == 0:
                 self.process_plotting()
                 current_sni = self.get_sni()
@@ -125,41 +194,37 @@ class SchellingModel:
                     sni[agent_type].append(None)
             if self.is_everyone_happy():
                 break
-            to_be_processed = self.occupied.copy()
-            how_many_moved = 0
-            while to_be_processed:
-                moved = False
-                agent = to_be_processed.pop()
-                if not agent.is_agent_happy(self.name_to_threshold[agent.agent]):
-                    if movement_type == 'random':
-                        moved = self.move_agent_random(agent)
-                    elif movement_type == 'happy':
-                        moved = self.move_agent_happy(agent, max_check_places)
-                how_many_moved += int(moved)
-            if how_many_moved <= good_enough_threshold:
+            if self.move_unhappy_agents(movement_type, max_check_places) <= good_enough_threshold:
                 break
 
         return sni
 
+    def move_unhappy_agents(self, movement_type: str, max_check_places: int) -> int:
+        """Single iteration of simulate, every agent unhappy when it starts moves if it is still unhappy at its turn.
+        Returns number of moves."""
+        to_be_processed = self.unhappy.copy()
+        how_many_moved = 0
+        while to_be_processed:
+            moved = False
+            agent = to_be_processed.pop()
+            if agent in self.unhappy:
+                if movement_type == 'random':
+                    moved = self.move_agent_random(agent)
+                elif movement_type == 'happy':
+                    moved = self.move_agent_happy(agent, max_check_places)
+            how_many_moved += int(moved)
+        return how_many_moved
+
     def move_agent_random(self, agent: cell.Cell) -> bool:
-        move_to_place = self.empties.pop()
-        move_to_place.agent = agent.agent
-        self.occupied.add(move_to_place)
-        agent.agent = None
-        self.occupied.remove(agent)
-        self.empties.add(agent)
+        move_to_place = self.empties.choice()
+        self._relocate(agent, move_to_place)
         return True
 
     def move_agent_happy(self, agent: cell.Cell, max_check_places: int) -> bool:
-        possible_places = random.sample(self.empties, max_check_places)
+        possible_places = self.empties.sample(max_check_places)
         for move_to_place in possible_places:
             if move_to_place.would_be_happy(agent.agent, self.name_to_threshold[agent.agent]):
-                move_to_place.agent = agent.agent
-                agent.agent = None
-                self.occupied.add(move_to_place)
-                self.occupied.remove(agent)
-                self.empties.add(agent)
-                self.empties.remove(move_to_place)
+                self._relocate(agent, move_to_place)
                 return True
         return False
 
@@ -0,0 +1,56 @@
+import random
+from typing import Dict, Generic, Hashable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar('T', bound=Hashable)
+
+
+class VacancyPool(Generic[T]):
+    """Set of items kept as dense list with position of every item in it, so items can be drawn uniformly at random.
+
+    Removal moves the last item into the place of the removed one, so adding, removing and drawing take constant
+    time, and sample of k items takes O(k).
+    """
+
+    _items: List[T]
+    _positions: Dict[T, int]
+
+    def __init__(self, items: Iterable[T] = ()):
+        self._items = []
+        self._positions = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._positions
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items)
+
+    def add(self, item: T):
+        if item not in self._positions:
+            self._positions[item] = len(self._items)
+            self._items.append(item)
+
+    def remove(self, item: T):
+        position = self._positions.pop(item)
+        last = self._items.pop()
+        if position < len(self._items):
+            self._items[position] = last
+            self._positions[last] = position
+
+    def discard(self, item: T):
+        if item in self._positions:
+            self.remove(item)
+
+    def choice(self) -> T:
+        """Uniformly random item, which stays in the pool."""
+        if not self._items:
+            raise IndexError('Choice from an empty pool.')
+        return self._items[random.randrange(len(self._items))]
+
+    def sample(self, k: int) -> List[T]:
+        """Up to k distinct items drawn uniformly at random, all of them if there are fewer."""
+        return random.sample(self._items, min(k, len(self._items)))
@@ -1,8 +1,10 @@
+import functools
 import os
-from typing import List, Tuple
+from typing import List, Tuple, Callable, Optional, Any
 
-from AgentBasedModeling.helpers.burning import forest_fire_model as ffm
+from AgentBasedModeling.helpers.burning import forest_fire_model as ffm, lattice_fire_model as lfm, scenarios
 from AgentBasedModeling.common.log import logger
+from AgentBasedModeling.common.parallel import sweep_runner as sr
 
 plt = ffm.pe.slp.plt
 
@@ -11,31 +13,55 @@ LOGGER.setLevel(10)
 
 
 def find_avg_cluster(
-    lattice_size: int, plant_probability: float, state: str = 'burned', monte_carlo_repetitions: int = 100
+    lattice_size: int, plant_probability: float, state: str = 'burned', monte_carlo_repetitions: int = 100,
+    fire_model: Callable[[int, float], ffm.ForestFireModel] = ffm.ForestFireModel, batched: bool = False,
+    seed: Optional[Any] = None, wind_state: Optional[ffm.wind.Wind] = None
 ):
+    """Mean size of the biggest cluster of cells in state. Every repetition is seeded by its own child of the seed,
+    see scenarios.seeded_fire, and random wind by another one."""
+    seeds = sr.child_seeds(seed, monte_carlo_repetitions + 1)
+    wind_state = scenarios.task_wind(wind_state, seeds[-1])
+    if batched:
+        replicas = lfm.BatchedForestFireModel(
+            monte_carlo_repetitions, lattice_size, plant_probability, seeds[0], wind_state=wind_state
+        )
+        return float(replicas.run(state).biggest_cluster.mean())
     summed_cluster_sizes = 0
-    for _ in range(monte_carlo_repetitions):
-        fire = ffm.ForestFireModel(lattice_size, plant_probability)
+    for repetition_seed in seeds[:-1]:
+        fire = scenarios.seeded_fire(fire_model, lattice_size, plant_probability, repetition_seed, wind_state)
         fire.create_cells()
         fire.plant_trees()
         fire.start_fire()
         fire.burn()
-        summed_cluster_sizes += fire.find_biggest_cluster_by_me(state)
+        summed_cluster_sizes += fire.find_clusters(state).biggest
 
     return summed_cluster_sizes / monte_carlo_repetitions
 
 
 def create_cluster_plot(
     lattice_size: int, probs: List[float], fig_size: Tuple[float, float], state: str = 'burned',
-    out_file: str = 'cluster_size.png', monte_carlo_repetitions: int = 100
+    out_file: str = 'cluster_size.png', monte_carlo_repetitions: int = 100,
+    fire_model: Callable[[int, float], ffm.ForestFireModel] = ffm.ForestFireModel, batched: bool = False,
+    workers: Optional[int] = None, wind_state: Optional[ffm.wind.Wind] = None
 ):
     fig = plt.figure(figsize=fig_size)
     ax = fig.add_subplot()
     line_handlers = []
-    cluster_sizes = []
-    for p in probs:
-        LOGGER.debug(f"Calculating for p = {p}.")
-        cluster_sizes.append(find_avg_cluster(lattice_size, p, state, monte_carlo_repetitions))
+    if workers is not None:
+        cluster_sizes = sr.column(sr.SweepRunner(
+            functools.partial(
+                find_avg_cluster, state=state, monte_carlo_repetitions=monte_carlo_repetitions,
+                fire_model=fire_model, batched=batched, wind_state=wind_state
+            ),
+            workers=workers
+        ).run(sr.grid_of(lattice_size=[lattice_size], plant_probability=probs)), 'value')
+    else:
+        cluster_sizes = []
+        for p in probs:
+            LOGGER.debug(f"Calculating for p = {p}.")
+            cluster_sizes.append(find_avg_cluster(
+                lattice_size, p, state, monte_carlo_repetitions, fire_model, batched, wind_state=wind_state
+            ))
     line_handlers.append(ax.plot(probs, cluster_sizes, label=f"L = {lattice_size}"))
     ax.legend()
     ax.set_title('Average biggest cluster size.')
@@ -52,11 +78,12 @@ def create_cluster_plot(
 
 
 def initialize_all(wind_angle: float = 0, wind_power: float = 0, wind_random: bool = False):
-    ffm.wind.Wind().power = wind_power
-    ffm.wind.Wind().direction = wind_angle
-    ffm.wind.Wind().is_state_random = wind_random
+    wind_state = ffm.wind.Wind(wind_angle, wind_power, wind_random)
     probabilities = [p / 30 for p in range(1, 30)]
-    create_cluster_plot(100, probabilities, (10, 8), monte_carlo_repetitions=100)
+    create_cluster_plot(
+        100, probabilities, (10, 8), monte_carlo_repetitions=100, batched=True, workers=os.cpu_count(),
+        wind_state=wind_state
+    )
 
 
 if __name__ == '__main__':
@@ -1,8 +1,11 @@
+import functools
 import os
-from typing import List, Tuple
+from typing import List, Tuple, Callable, Optional, Any
 
-from AgentBasedModeling.helpers.burning import forest_fire_model as ffm
+from AgentBasedModeling.helpers.burning import forest_fire_model as ffm, lattice_fire_model as lfm, newman_ziff as nz
+from AgentBasedModeling.helpers.burning import scenarios
 from AgentBasedModeling.common.log import logger
+from AgentBasedModeling.common.parallel import sweep_runner as sr
 
 plt = ffm.pe.slp.plt
 LOGGER = logger.get_logger(__name__)
@@ -10,31 +13,63 @@ LOGGER.setLevel(10)
 
 
 def find_percolation_probability(
-        lattice_size: int, plant_probability: float, monte_carlo_repetitions: int = 100
+        lattice_size: int, plant_probability: float, monte_carlo_repetitions: int = 100,
+        fire_model: Callable[[int, float], ffm.ForestFireModel] = ffm.ForestFireModel, batched: bool = False,
+        seed: Optional[Any] = None, wind_state: Optional[ffm.wind.Wind] = None
 ) -> float:
+    """Fraction of fires reaching the top. Every repetition is seeded by its own child of the seed, see
+    scenarios.seeded_fire, and random wind by another one."""
+    seeds = sr.child_seeds(seed, monte_carlo_repetitions + 1)
+    wind_state = scenarios.task_wind(wind_state, seeds[-1])
+    if batched:
+        replicas = lfm.BatchedForestFireModel(
+            monte_carlo_repetitions, lattice_size, plant_probability, seeds[0], wind_state=wind_state
+        )
+        return float(replicas.run(mode='percolation').is_top_hit.mean())
     times_burned = 0
-    for _ in range(monte_carlo_repetitions):
-        fire = ffm.ForestFireModel(lattice_size, plant_probability)
+    for repetition_seed in seeds[:-1]:
+        fire = scenarios.seeded_fire(fire_model, lattice_size, plant_probability, repetition_seed, wind_state)
         fire.create_cells()
         fire.plant_trees()
         fire.start_fire()
-        fire.burn()
+        fire.burn('percolation')
         times_burned += int(fire.is_top_hit)
     return times_burned / monte_carlo_repetitions
 
 
 def create_percolation_plot(
         lattice_sizes: List[int], probs: List[float], fig_size: Tuple[float, float],
-        out_file: str = 'perc_prob.png', monte_carlo_repetitions: int = 100
+        out_file: str = 'perc_prob.png', monte_carlo_repetitions: int = 100,
+        fire_model: Callable[[int, float], ffm.ForestFireModel] = ffm.ForestFireModel,
+        method: str = 'simulation', batched: bool = False, workers: Optional[int] = None,
+        wind_state: Optional[ffm.wind.Wind] = None
 ):
+    if method == 'newman_ziff' and wind_state is not None and (wind_state.power > 0 or wind_state.is_state_random):
+        LOGGER.warning('Newman-Ziff sweep is equivalent to fire spread only without wind.')
     fig = plt.figure(figsize=fig_size)
     ax = fig.add_subplot()
     line_handlers = []
+    if method != 'newman_ziff' and workers is not None:
+        table = sr.SweepRunner(
+            functools.partial(
+                find_percolation_probability, monte_carlo_repetitions=monte_carlo_repetitions, fire_model=fire_model,
+                batched=batched, wind_state=wind_state
+            ),
+            workers=workers
+        ).run(sr.grid_of(lattice_size=lattice_sizes, plant_probability=probs))
     for L in lattice_sizes:
-        percolation_probs = []
-        for p in probs:
-            LOGGER.debug(f"Calculating for L = {L}, p = {p}.")
-            percolation_probs.append(find_percolation_probability(L, p, monte_carlo_repetitions))
+        if method == 'newman_ziff':
+            LOGGER.debug(f"Sweeping for L = {L}.")
+            percolation_probs = nz.sweep(L, probs, monte_carlo_repetitions).spanning_probability
+        elif workers is not None:
+            percolation_probs = sr.column(table, 'value', lattice_size=L)
+        else:
+            percolation_probs = []
+            for p in probs:
+                LOGGER.debug(f"Calculating for L = {L}, p = {p}.")
+                percolation_probs.append(find_percolation_probability(
+                    L, p, monte_carlo_repetitions, fire_model, batched, wind_state=wind_state
+                ))
         line_handlers.append(ax.plot(probs, percolation_probs, label=f"L = {L}"))
     ax.legend()
     ax.set_title('Percolation probability for different lattice size.')
@@ -50,12 +85,19 @@ def create_percolation_plot(
 
 
 def initialize_all(wind_angle: float = 0, wind_power: float = 0, wind_random: bool = False):
-    ffm.wind.Wind().power = wind_power
-    ffm.wind.Wind().direction = wind_angle
-    ffm.wind.Wind().is_state_random = wind_random
+    wind_state = ffm.wind.Wind(wind_angle, wind_power, wind_random)
     sizes_to_create = [10, 20, 50, 100]
     probabilities = [p / 10 for p in range(1, 10)]
-    create_percolation_plot(sizes_to_create, probabilities, (10, 8), monte_carlo_repetitions=100)
+    if wind_power == 0 and not wind_random:
+        create_percolation_plot(
+            sizes_to_create, probabilities, (10, 8), monte_carlo_repetitions=100, method='newman_ziff',
+            wind_state=wind_state
+        )
+    else:
+        create_percolation_plot(
+            sizes_to_create, probabilities, (10, 8), monte_carlo_repetitions=100, batched=True,
+            workers=os.cpu_count(), wind_state=wind_state
+        )
 
 
 if __name__ == "__main__":
@@ -7,12 +7,9 @@ def create_animation(
         lattice_size: int, plant_probability: float, out_fig_size: Tuple[float, float] = (11.5, 8),
         wind_angle: float = 0, wind_power: float = 0, wind_random: bool = False
 ):
-    ffm.wind.Wind().power = wind_power
-    ffm.wind.Wind().direction = wind_angle
-    ffm.wind.Wind().is_state_random = wind_random
-
     fire = ffm.ForestFireModel(
-        lattice_size, plant_probability, ffm.pe.PlottingEngine(lattice_size, out_fig_size, 'Anim_dump_folder')
+        lattice_size, plant_probability, ffm.pe.PlottingEngine(lattice_size, out_fig_size, 'Anim_dump_folder'),
+        wind_state=ffm.wind.Wind(wind_angle, wind_power, wind_random)
     )
     fire.create_cells()
     fire.plant_trees()
@@ -1,154 +1,67 @@
-from AgentBasedModeling.helpers.burning import wind
-import matplotlib.pyplot as plt
-
-import AgentBasedModeling.helpers.burning.forest_fire_model as ffm
-
-
-def change_wind(direction: float, power: float, randomize: bool):
-    wind.Wind().power = power
-    wind.Wind().direction = direction
-    wind.Wind().is_state_random = randomize
-
-
-def process_forest(fire: ffm.ForestFireModel):
-    fire.start_fire()
-    fire.burn()
-
-
-lattice_size = 50
-
-probs = [p / 20 for p in range(20)]
-
-# # percolation
-#
-# fig = plt.figure(figsize=(10, 8))
-# ax = fig.add_subplot()
-#
-# perc_probs_no_wind = []
-# perc_probs_right = []
-# perc_probs_top = []
-# perc_probs_left = []
-# perc_probs_bottom = []
-#
-# for p in probs:
-#
-#     print(p)
-#
-#     counter_no_wind = 0
-#     counter_right = 0
-#     counter_top = 0
-#     counter_left = 0
-#     counter_bottom = 0
-#
-#     for i in range(100):
-#
-#         fir = ffm.ForestFireModel(lattice_size, p, None)
-#         fir.create_cells()
-#         fir.plant_trees()
-#
-#         change_wind(0, 0, False)  # no wind
-#         process_forest(fir)
-#         counter_no_wind += fir.is_top_hit
-#         change_wind(0, 1, False)  # right
-#         fir.restore()
-#         process_forest(fir)
-#         counter_right += fir.is_top_hit
-#         change_wind(90, 1, False)  # top
-#         fir.restore()
-#         process_forest(fir)
-#         counter_top += fir.is_top_hit
-#         change_wind(180, 1, False)  # left
-#         fir.restore()
-#         process_forest(fir)
-#         counter_left += fir.is_top_hit
-#         change_wind(270, 1, False)  # bottom
-#         fir.restore()
-#         process_forest(fir)
-#         counter_bottom += fir.is_top_hit
-#
-#     perc_probs_no_wind.append(counter_no_wind / 100)
-#     perc_probs_right.append(counter_right / 100)
-#     perc_probs_top.append(counter_top / 100)
-#     perc_probs_left.append(counter_left / 100)
-#     perc_probs_bottom.append(counter_bottom / 100)
-#
-#
-# ax.plot(probs, perc_probs_no_wind, label='no wind')
-# ax.plot(probs, perc_probs_right, label='to right')
-# ax.plot(probs, perc_probs_top, label='to top')
-# ax.plot(probs, perc_probs_left, label='to left')
-# ax.plot(probs, perc_probs_bottom, label='to bottom')
-#
-# ax.legend()
-# ax.set_title('Percolation probability for different winds.')
-# ax.set_xlabel('plant probability')
-# ax.set_ylabel('percolation probability')
-#
-# fig.savefig('wind_percolation_compare.png')
-
-# avg biggest cluster
+import os
+from typing import Dict, Any, Optional
 
-fig = plt.figure(figsize=(10, 8))
-ax = fig.add_subplot()
+import numpy as np
 
-cluster_sizes_no_wind = []
-cluster_sizes_right = []
-cluster_sizes_top = []
-cluster_sizes_left = []
-cluster_sizes_bottom = []
-
-for p in probs:
-
-    print(p)
-
-    counter_no_wind = 0
-    counter_right = 0
-    counter_top = 0
-    counter_left = 0
-    counter_bottom = 0
-
-    for i in range(100):
-
-        fir = ffm.ForestFireModel(lattice_size, p, None)
-        fir.create_cells()
-        fir.plant_trees()
-
-        change_wind(0, 0, False)  # no wind
-        process_forest(fir)
-        counter_no_wind += fir.find_biggest_cluster_by_me()
-        change_wind(0, 1, False)  # right
-        fir.restore()
-        process_forest(fir)
-        counter_right += fir.find_biggest_cluster_by_me()
-        change_wind(90, 1, False)  # top
-        fir.restore()
-        process_forest(fir)
-        counter_top += fir.find_biggest_cluster_by_me()
-        change_wind(180, 1, False)  # left
-        fir.restore()
-        process_forest(fir)
-        counter_left += fir.find_biggest_cluster_by_me()
-        change_wind(270, 1, False)  # bottom
-        fir.restore()
-        process_forest(fir)
-        counter_bottom += fir.find_biggest_cluster_by_me()
-
-    cluster_sizes_no_wind.append(counter_no_wind / 100)
-    cluster_sizes_right.append(counter_right / 100)
-    cluster_sizes_top.append(counter_top / 100)
-    cluster_sizes_left.append(counter_left / 100)
-    cluster_sizes_bottom.append(counter_bottom / 100)
-
-
-ax.plot(probs, cluster_sizes_no_wind, label='no wind')
-ax.plot(probs, cluster_sizes_right, label='to right')
-ax.plot(probs, cluster_sizes_top, label='to top')
-ax.plot(probs, cluster_sizes_left, label='to left')
-ax.plot(probs, cluster_sizes_bottom, label='to bottom')
-
-ax.legend()
-ax.set_title('Biggest cluster size for different winds.')
-ax.set_xlabel('plant probability')
-ax.set_ylabel('percolation probability')
+from AgentBasedModeling.helpers.burning import wind, scenarios
+from AgentBasedModeling.common.parallel import sweep_runner as sr
+import matplotlib.pyplot as plt
 
-fig.savefig('wind_biggest_cluster_compare.png')
\ No newline at end of file
+# label: (direction, power)
+WIND_SCENARIOS = {
+    'no wind': (0, 0),
+    'to right': (0, 1),
+    'to top': (90, 1),
+    'to left': (180, 1),
+    'to bottom': (270, 1)
+}
+
+
+def compare_winds(
+        lattice_size: int, plant_probability: float, measure: str = 'cluster',
+        monte_carlo_repetitions: int = 100, seed: Optional[Any] = None
+) -> Dict[str, float]:
+    """Burn every planted forest once per wind scenario and average either biggest cluster or percolation.
+
+    All scenarios of a forest are burned together with common random numbers, see SharedForestScenarios.
+    """
+    rng = np.random.default_rng(seed)
+    winds = [wind.Wind(direction, power) for direction, power in WIND_SCENARIOS.values()]
+    summed = np.zeros(len(winds))
+    for _ in range(monte_carlo_repetitions):
+        trees = scenarios.plant_forest(lattice_size, plant_probability, rng)
+        forest = scenarios.SharedForestScenarios(trees, winds, rng)
+        if measure == 'percolation':
+            summed += forest.run(mode='percolation').is_top_hit
+        else:
+            summed += forest.run().biggest_cluster
+    return dict(zip(WIND_SCENARIOS, (summed / monte_carlo_repetitions).tolist()))
+
+
+def create_wind_plot(
+        lattice_size: int, measure: str = 'cluster', workers: Optional[int] = None, monte_carlo_repetitions: int = 100
+):
+    probs = [p / 20 for p in range(20)]
+    table = sr.SweepRunner(compare_winds, workers=workers).run(sr.grid_of(
+        lattice_size=[lattice_size], plant_probability=probs, measure=[measure],
+        monte_carlo_repetitions=[monte_carlo_repetitions]
+    ))
+
+    fig = plt.figure(figsize=(10, 8))
+    ax = fig.add_subplot()
+    for label in WIND_SCENARIOS:
+        ax.plot(probs, sr.column(table, label), label=label)
+    ax.legend()
+    ax.set_xlabel('plant probability')
+    if measure == 'percolation':
+        ax.set_title('Percolation probability for different winds.')
+        ax.set_ylabel('percolation probability')
+        fig.savefig('wind_percolation_compare.png')
+    else:
+        ax.set_title('Biggest cluster size for different winds.')
+        ax.set_ylabel('cluster size')
+        fig.savefig('wind_biggest_cluster_compare.png')
+
+
+if __name__ == '__main__':
+    create_wind_plot(50, 'cluster', workers=os.cpu_count())
@@ -0,0 +1,57 @@
+import argparse
+import sys
+from typing import Optional, Type
+
+import numpy as np
+
+from AgentBasedModeling.helpers.game_of_life import array_game, bitboard_game, game, sparse_game
+from AgentBasedModeling.common.log import logger
+
+LOGGER = logger.get_logger(__name__)
+
+ENGINES = {
+    'object': game.GameOfLife, 'array': array_game.ArrayGameOfLife,
+    'bitboard': bitboard_game.BitboardGameOfLife, 'sparse': sparse_game.SparseGameOfLife
+}
+
+
+def check_advance(
+        game_class: Type[game.GameOfLife], trials: int = 100, size: int = 10, max_generations: int = 64,
+        density: float = 0.3, seed: Optional[int] = None
+) -> int:
+    """Compare advance(n) with n calls to step on random boards of the standard rule, return number of mismatches."""
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for trial in range(trials):
+        initial_state = (rng.random((size, size)) < density).astype(int)
+        generations = int(rng.integers(1, max_generations + 1))
+        jumped = game_class(initial_state, plot=False)
+        stepped = game_class(initial_state, plot=False)
+        jumped.link_cells()
+        stepped.link_cells()
+        jumped.advance(generations)
+        for _ in range(generations):
+            stepped.step()
+        if not np.array_equal(jumped.alive_array(), stepped.alive_array()):
+            mismatches += 1
+            LOGGER.error('Trial {t}: advance({n}) differs from {n} steps.'.format(t=trial, n=generations))
+    return mismatches
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Check GameOfLife.advance against stepping one by one.')
+    arg_parser.add_argument('--engine', choices=list(ENGINES), default='array', help='Simulation engine.')
+    arg_parser.add_argument('--trials', '-n', type=int, default=100, help='Number of random boards.')
+    arg_parser.add_argument('--size', '-l', type=int, default=10, help='Length of board side.')
+    arg_parser.add_argument('--max_generations', '-g', type=int, default=64, help='Most generations advanced.')
+    arg_parser.add_argument('--seed', type=int, default=None, help='Seed of random boards.')
+    args = arg_parser.parse_args()
+    mismatches = check_advance(
+        ENGINES[args.engine], args.trials, args.size, args.max_generations, seed=args.seed
+    )
+    LOGGER.info('{m} of {n} boards differ.'.format(m=mismatches, n=args.trials))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
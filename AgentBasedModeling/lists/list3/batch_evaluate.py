@@ -0,0 +1,184 @@
+import argparse
+import csv
+import functools
+import glob
+import os
+import time
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+
+from AgentBasedModeling.helpers.game_of_life import array_game, board_history as bh
+from AgentBasedModeling.common.log import logger
+from AgentBasedModeling.common.parallel import sweep_runner as sr
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+LOGGER = logger.get_logger(__name__)
+
+STATE_FILE = 'state.csv'
+NEIGHBOURHOOD_FILE = 'neighbourhood.csv'
+COLUMNS = [
+    'pattern', 'path', 'width', 'height', 'classification', 'period', 'displacement_x', 'displacement_y',
+    'transient', 'population', 'wall_time'
+]
+
+
+def pattern_files(sources: Iterable[str]) -> List[str]:
+    """Pattern files of directories (every state.csv below them) and glob patterns, sorted and without repetitions."""
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for directory, _, names in os.walk(source):
+                if STATE_FILE in names:
+                    files.add(os.path.join(directory, STATE_FILE))
+        else:
+            files.update(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return sorted(files)
+
+
+def pattern_name(path: str) -> str:
+    """Name of the directory for state.csv files of the pattern library, file name for anything else."""
+    if os.path.basename(path) == STATE_FILE:
+        return os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def classify(gol: array_game.ArrayGameOfLife, max_iterations: int) -> sr.Row:
+    """Step the game until it dies, repeats a board, or repeats its shape elsewhere on the board.
+
+    Repeated board is still life (period 1) or oscillator, repeated shape of the bounding box of living cells with
+    the box moved is spaceship. Transient is the step of the first board of the cycle, or of the empty one.
+    """
+    boards, shapes = bh.BoardHistory(gol.history_size), bh.BoardHistory(gol.history_size)
+    corners = {}
+    for it in range(max_iterations + 1):
+        board = gol.alive_array()
+        living = np.argwhere(board)
+        if not len(living):
+            return dict(classification='died', transient=it)
+        seen = boards.visit(board, it)
+        if seen is not None:
+            return dict(classification='still' if it - seen == 1 else 'oscillator', period=it - seen, transient=seen)
+        low, high = living.min(axis=0), living.max(axis=0)
+        corners[it] = low
+        seen = shapes.visit(board[low[0]:high[0] + 1, low[1]:high[1] + 1], it)
+        if seen is not None:
+            displacement_x, displacement_y = (low - corners[seen]).tolist()
+            return dict(
+                classification='spaceship', period=it - seen, transient=seen,
+                displacement_x=displacement_x, displacement_y=displacement_y
+            )
+        if it < max_iterations:
+            gol.step()
+    return dict(classification='unresolved')
+
+
+def evaluate_pattern(
+        path: str, max_iterations: int = 1000, borders: Iterable[str] = (), delimiter: str = ',',
+        truth_marker: Any = '1', seed: Optional[Any] = None
+) -> sr.Row:
+    """Row of the results table for a single pattern file, run headless on the array engine.
+    neighbourhood.csv beside the pattern file is used as its neighbourhood."""
+    start = time.perf_counter()
+    neighbourhood_path = os.path.join(os.path.dirname(path), NEIGHBOURHOOD_FILE)
+    gol = array_game.ArrayGameOfLife.from_file(
+        path, delimiter=delimiter, truth_marker=truth_marker, plot=False, borders=borders,
+        neighbourhood_path=neighbourhood_path if os.path.isfile(neighbourhood_path) else None
+    )
+    row = dict.fromkeys(COLUMNS)
+    row.update(pattern=pattern_name(path), path=path, width=gol.width, height=gol.height)
+    row.update(classify(gol, max_iterations))
+    row.update(population=int(gol.alive_array().sum()), wall_time=time.perf_counter() - start)
+    return row
+
+
+def write_table(rows: List[sr.Row], out_path: str):
+    """CSV table, or Parquet one (needs pandas with a Parquet engine) for .parquet extension."""
+    if out_path.lower().endswith('.parquet'):
+        if pd is None:
+            raise ImportError('Writing Parquet table needs pandas, use .csv extension to write CSV table.')
+        pd.DataFrame(rows, columns=COLUMNS).to_parquet(out_path, index=False)
+        return
+    with open(out_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def evaluate_library(
+        sources: Iterable[str], out_path: str, max_iterations: int = 1000, borders: Iterable[str] = (),
+        delimiter: str = ',', truth_marker: Any = '1', workers: Optional[int] = None, chunk_size: int = 16
+) -> List[sr.Row]:
+    """Evaluate every pattern of the sources in a process pool and write the results table, ordered by path."""
+    files = pattern_files(sources)
+    task = functools.partial(
+        evaluate_pattern, max_iterations=max_iterations, borders=tuple(borders), delimiter=delimiter,
+        truth_marker=truth_marker
+    )
+    start = time.perf_counter()
+    rows = sr.SweepRunner(task, workers=workers, chunk_size=chunk_size).run(sr.grid_of(path=files))
+    for row in rows:
+        row.pop('seed_index', None)
+    write_table(rows, out_path)
+    LOGGER.info('Evaluated {n} patterns in {t:.2f} s into {path}.'.format(
+        n=len(rows), t=time.perf_counter() - start, path=out_path
+    ))
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Classify a library of game of life patterns headless.')
+    arg_parser.add_argument(
+        'sources', nargs='+',
+        help='Directories (every state.csv below them is a pattern) or glob patterns of pattern files.'
+    )
+    arg_parser.add_argument(
+        '--out_path', '-o',
+        action='store', required=False, default='patterns.csv',
+        help='Results table, .parquet extension writes Parquet, anything else CSV.'
+    )
+    arg_parser.add_argument(
+        '--max_iterations', '-n',
+        action='store', required=False, default=1000, type=int,
+        help='Generations after which pattern is unresolved.'
+    )
+    arg_parser.add_argument(
+        '--pass_through_border', '-b',
+        action='append', required=False,
+        choices=['bottom', 'top', 'left', 'right'],
+        default=[], dest='borders',
+        help='Aggregate borders that are passable.'
+    )
+    arg_parser.add_argument(
+        '--separator', '-s',
+        action='store', required=False, default=',', type=str,
+        help='Input files delimiters.'
+    )
+    arg_parser.add_argument(
+        '--alive_marker', '-m',
+        action='store', required=False, default='1',
+        help='Marker used to denote alive cell in input files.'
+    )
+    arg_parser.add_argument(
+        '--workers', '-w',
+        action='store', required=False, default=None, type=int,
+        help='Number of processes, all CPUs by default.'
+    )
+    arg_parser.add_argument(
+        '--chunk_size', '-c',
+        action='store', required=False, default=16, type=int,
+        help='Patterns evaluated by a single task.'
+    )
+    args = arg_parser.parse_args()
+    evaluate_library(
+        args.sources, args.out_path, args.max_iterations, args.borders, args.separator,
+        args.alive_marker, args.workers, args.chunk_size
+    )
+
+
+if __name__ == '__main__':
+    main()
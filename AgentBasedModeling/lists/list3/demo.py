@@ -17,3 +17,6 @@ for s_dir_path, _, files in os.walk(os.path.join(root, 'Games')):
         gol.link_cells()
         gol.process()
         gol.plotting_engine.animate()
+        print('{name}: transient {t}, period {p}'.format(
+            name=os.path.basename(s_dir_path), t=gol.transient_length, p=gol.period
+        ))
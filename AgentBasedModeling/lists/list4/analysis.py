@@ -1,5 +1,5 @@
 import os
-from typing import Collection
+from typing import Collection, Type
 
 from AgentBasedModeling.helpers.schellings import schellings_model as sm
 from AgentBasedModeling.common.log import logger
@@ -27,9 +27,10 @@ def create_initial_and_final_pictures_only(
         thresholds: Collection[int] = (4, 4),
         movement_type: str = 'random',
         good_enough_threshold: int = -1,
-        max_check_places: int = 10
+        max_check_places: int = 10,
+        model: Type[sm.SchellingModel] = sm.SchellingModel
 ):
-    sch_model = sm.SchellingModel(grid_length, neighbourhood_depth, agents_counts,thresholds, plot=True)
+    sch_model = model(grid_length, neighbourhood_depth, agents_counts, thresholds, plot=True)
     sch_model.create_cells_links()
     sch_model.process_plotting()
     sch_model.simulate(
@@ -48,12 +49,13 @@ def iterations_to_population_size_relation(
         thresholds: Collection[int] = (4, 4),
         movement_type: str = 'random',
         good_enough_threshold: int = -1,
-        max_check_places: int = 10
+        max_check_places: int = 10,
+        model: Type[sm.SchellingModel] = sm.SchellingModel
 ):
     no_iterations = []
     for agents_counts in population_sizes:
         LOGGER.debug(f'Processing for agents count: {agents_counts}.')
-        sch_model = sm.SchellingModel(grid_length, neighbourhood_depth, agents_counts, thresholds, plot=False)
+        sch_model = model(grid_length, neighbourhood_depth, agents_counts, thresholds, plot=False)
         sch_model.create_cells_links()
         ret_dict = sch_model.simulate(
             movement_type=movement_type,
@@ -81,12 +83,13 @@ def segregation_index_to_acceptance_relation(
         agents_counts: Collection[int] = (2500, 2500),
         movement_type: str = 'random',
         good_enough_threshold: int = -1,
-        max_check_places: int = 10
+        max_check_places: int = 10,
+        model: Type[sm.SchellingModel] = sm.SchellingModel
 ):
     sni_dict = {i: [] for i in range(len(agents_counts))}
     for thresholds in thresholds_to_check:
         LOGGER.debug(f'Processing for thresholds {thresholds}.')
-        sch_model = sm.SchellingModel(grid_length, neighbourhood_depth, agents_counts, thresholds, plot=False)
+        sch_model = model(grid_length, neighbourhood_depth, agents_counts, thresholds, plot=False)
         sch_model.create_cells_links()
         sch_model.simulate(
             movement_type=movement_type,
@@ -120,12 +123,13 @@ def segregation_index_to_neighbourhood_relation(
         agents_counts: Collection[int] = (2500, 2500),
         movement_type: str = 'random',
         good_enough_threshold: int = -1,
-        max_check_places: int = 10
+        max_check_places: int = 10,
+        model: Type[sm.SchellingModel] = sm.SchellingModel
 ):
     sni_dict = {i: [] for i in range(len(agents_counts))}
     for neighbourhood_depth in depths:
         LOGGER.debug(f'Processing for depth {neighbourhood_depth}.')
-        sch_model = sm.SchellingModel(
+        sch_model = model(
             grid_length,
             neighbourhood_depth,
             agents_counts,